@@ -0,0 +1,117 @@
+import numpy as np
+from gymnasium import spaces
+
+
+class ArrayEnv:
+    """Agent-indexed array interface on top of a mesa-gym grid environment.
+
+    Instead of dicts keyed by `unique_id`, actions, observations, rewards and infos are
+    arrays with one row per agent. The agents are indexed at reset, in the order given by
+    the environment (`agent_ids[i]` is the unique id of the agent at index i), and keep
+    their index for the whole episode, also after having been removed from the world.
+
+    `step(actions)` returns:
+    - observations: array (n_agents, n_features), global observations are repeated for each agent,
+      percepts of different sizes are padded with zeros; with hashed observations (`hashed_obs`),
+      array (n_agents,) of the 64-bit hashes (uint64)
+    - rewards: array (n_agents,), or (n_agents, n_values) for vector rewards
+    - terminated, truncated: boolean arrays (n_agents,), an agent removed from the world is terminated
+    - infos: structured array (n_agents,) with the `info_fields` of the environment, NaN if missing
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.info_dtype = np.dtype([(field, np.float64) for field in env.info_fields])
+        self.per_agent_obs = isinstance(env.observation_space, spaces.Dict)
+
+    def reset(self, seed=None, options=None):
+        self.env.reset(seed=seed, options=options)
+
+        self.agents = list(self.env._get_agents())
+        self.agent_ids = np.array([agent.unique_id for agent in self.agents])
+        self.agent_index = {agent.unique_id: i for i, agent in enumerate(self.agents)}
+        self.actions = self.env.potential_actions
+        self.n_features = None
+
+        return self._get_obs(), self._get_info()
+
+    def step(self, actions):
+        for agent, action in zip(self.agents, actions):
+            agent.next_action = self.actions[action]
+
+        terminated, events = self.env._step_world()
+
+        rewards = self._get_rewards(events)
+        observations = self._get_obs()
+        infos = self._get_info()
+
+        removed = np.array([agent.pos is None for agent in self.agents], dtype=bool)
+        terminated = np.logical_or(removed, terminated)
+        truncated = np.full(len(self.agents), self.env.truncated, dtype=bool)
+
+        return observations, rewards, terminated, truncated, infos
+
+    def _get_obs(self):
+        if getattr(self.env, "hashed_obs", False):
+            # kept as integers, as a float would merge distinct hashes
+            return np.full(len(self.agents), self.env._get_obs(), dtype=np.uint64)
+        if not self.per_agent_obs:
+            observation = np.asarray(self.env._get_obs(), dtype=np.float32)
+            return np.broadcast_to(observation, (len(self.agents), len(observation)))
+
+        percepts = [agent.get_percepts() for agent in self.agents]
+        if self.n_features is None:
+            self.n_features = max(len(agent_percepts) for agent_percepts in percepts)
+        observations = np.zeros((len(self.agents), self.n_features), dtype=np.float32)
+        for i, agent_percepts in enumerate(percepts):
+            # agents removed from the world have no percepts
+            observations[i, :len(agent_percepts)] = agent_percepts
+        return observations
+
+    def _get_rewards(self, events):
+        # the rules of the environment write directly in the dense rewards
+        rewards = RewardArray(self.agent_index)
+        self.env._get_rewards(events, rewards)
+        return rewards.get()
+
+    def _get_info(self):
+        # filled from the events of the step, and the state fields of the agents reported:
+        # the agents in the world, and those removed during the step
+        infos = np.full(len(self.agents), np.nan, dtype=self.info_dtype)
+        events = self.env.events
+        reported = np.array([agent.pos is not None or agent in events for agent in self.agents], dtype=bool)
+        for field in self.env.state_fields:
+            infos[field][reported] = [getattr(agent, field) for agent, shown in zip(self.agents, reported) if shown]
+        if self.env.truncated:
+            infos["truncated"][reported] = 1
+        for agent, agent_events in events.items():
+            i = self.agent_index.get(agent.unique_id)
+            if i is not None:
+                for key, value in agent_events.items():
+                    infos[key][i] = value
+        return infos
+
+    def close(self):
+        self.env.close()
+
+
+class RewardArray:
+    """Dense rewards of the agents (one row per index), written by the `_get_rewards(events, rewards)` of the
+    environments as they would write a dict keyed by unique id. Sized on the first reward (scalar or vector)."""
+
+    def __init__(self, agent_index):
+        self.agent_index = agent_index
+        self.rewards = None
+
+    def __setitem__(self, unique_id, reward):
+        if self.rewards is None:
+            self.rewards = np.zeros((len(self.agent_index),) + np.shape(reward))
+        self.rewards[self.agent_index[unique_id]] = reward
+
+    def __getitem__(self, unique_id):
+        if self.rewards is None:
+            raise KeyError(unique_id)
+        return self.rewards[self.agent_index[unique_id]]
+
+    def get(self):
+        return np.zeros(len(self.agent_index)) if self.rewards is None else self.rewards
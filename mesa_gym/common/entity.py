@@ -0,0 +1,29 @@
+class Entity:
+    """Lightweight base of the entities without a mind (trees, fruits, grass, water, ...).
+
+    Unlike mesa.Agent, entities have no per-instance dict nor random generator: their attributes
+    are declared in `__slots__` (subclasses declare theirs, possibly empty), and values shared by
+    many entities are best kept in the fields of the world (see mesa_gym.common.fields). They are
+    placed on the grid and registered like agents, but being passive they are not kept by the
+    scheduler (see TimerRandomActivation)."""
+
+    __slots__ = ("unique_id", "model", "pos")
+
+    passive = True
+
+    def __init__(self, unique_id, model):
+        self.unique_id = unique_id
+        self.model = model
+        self.pos = None
+
+    def get_state(self):
+        return None
+
+    def step(self):
+        pass
+
+    def show(self):
+        raise RuntimeError("Not defined symbol.")
+
+    def destroy(self):
+        self.model.remove_entity(self)
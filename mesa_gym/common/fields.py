@@ -0,0 +1,94 @@
+import numpy as np
+
+
+#######################
+# update rules
+#######################
+
+# a rule is a callable applied to a field at each step,
+# updating all the cells where the field is defined at once
+
+def decay(amount, floor=0):
+    """Decreases the value of the cells above `floor` by `amount`."""
+    def rule(field):
+        field.values[field.mask & (field.values > floor)] -= amount
+    return rule
+
+
+def growth(amount, up_to):
+    """Increases the value of the cells not above `up_to` by `amount`."""
+    def rule(field):
+        field.values[field.mask & (field.values <= up_to)] += amount
+    return rule
+
+
+def clamp(low=None, high=None):
+    """Keeps the values within [low, high]."""
+    def rule(field):
+        np.clip(field.values, low, high, out=field.values, where=field.mask)
+    return rule
+
+
+#######################
+# fields
+#######################
+
+class Field:
+    """Scalar value attached to the cells of the grid (eg. poison in water, amount of grass).
+
+    The values are stored in a (width, height) array, together with a mask telling
+    where the field is defined. Actors modify single cells, while the rules update
+    all the cells at each step."""
+
+    def __init__(self, name, width, height, rules=None):
+        self.name = name
+        self.values = np.zeros((width, height))
+        self.mask = np.zeros((width, height), dtype=bool)
+        self.rules = [] if rules is None else list(rules)
+
+    def place(self, pos, value=0):
+        self.mask[pos] = True
+        self.values[pos] = value
+
+    def remove(self, pos):
+        self.mask[pos] = False
+        self.values[pos] = 0
+
+    def get(self, pos):
+        return float(self.values[pos])
+
+    def set(self, pos, value):
+        self.values[pos] = value
+
+    def add(self, pos, amount):
+        self.values[pos] += amount
+
+    def add_rule(self, rule):
+        self.rules.append(rule)
+
+    def step(self):
+        for rule in self.rules:
+            rule(self)
+
+
+class FieldLayer:
+    """Named fields defined over the same grid."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.fields = {}
+
+    def add_field(self, name, rules=None):
+        self.fields[name] = Field(name, self.width, self.height, rules)
+        return self.fields[name]
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def step(self):
+        for field in self.fields.values():
+            field.step()
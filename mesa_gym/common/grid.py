@@ -0,0 +1,70 @@
+import mesa
+import numpy as np
+
+
+class TrackedMultiGrid(mesa.space.MultiGrid):
+    """MultiGrid recording when each cell last changed (an entity placed or removed), so that values
+    derived from the grid (percepts, positions) are only recomputed for the cells changed since.
+
+    Changes are counted by `tick`; `changed_at` gives the tick of the last change of each cell
+    (cell x * height + y). Worlds changing a perceived attribute of an entity (eg. its strength)
+    should `touch` its cell."""
+
+    def __init__(self, width, height, torus):
+        super().__init__(width, height, torus)
+        self.tick = 0
+        self.changed_at = np.zeros(width * height, dtype=np.int64)
+
+    def touch(self, pos):
+        x, y = pos
+        self.tick += 1
+        self.changed_at[x * self.height + y] = self.tick
+
+    def place_agent(self, agent, pos):
+        super().place_agent(agent, pos)
+        self.touch(pos)
+
+    def remove_agent(self, agent):
+        pos = agent.pos
+        super().remove_agent(agent)
+        self.touch(pos)
+
+    def changed_since(self, tick):
+        """Coordinates (xs, ys) of the cells changed after `tick`."""
+        cells = np.flatnonzero(self.changed_at > tick)
+        return cells // self.height, cells % self.height
+
+
+class PositionPlanes:
+    """Number of entities of each type in each cell, as observed by get_positions: one plane per type
+    known to the registry, ordered by name, with cells x + y * width. The planes are kept up to date
+    from the cells changed in the (tracked) grid since the previous call, instead of being rebuilt."""
+
+    def __init__(self, model):
+        self.model = model
+        self.types = None
+        self.planes = None
+        self.tick = 0
+
+    def _rebuild(self):
+        model = self.model
+        # types whose entities have all been removed keep their (empty) plane
+        self.types = sorted(model.entities.types(), key=str)
+        self.planes = np.zeros((len(self.types), model.height, model.width), dtype=np.int64)
+        for plane, entity_type in enumerate(self.types):
+            for entity in model.entities.of_type(entity_type):
+                x, y = entity.pos
+                self.planes[plane, y, x] += 1
+
+    def get(self):
+        grid = self.model.grid
+        if self.types is None or len(self.model.entities.types()) != len(self.types):
+            self._rebuild()
+        elif self.tick < grid.tick:
+            xs, ys = grid.changed_since(self.tick)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                contents = grid.get_cell_list_contents((x, y))
+                for plane, entity_type in enumerate(self.types):
+                    self.planes[plane, y, x] = sum(isinstance(entity, entity_type) for entity in contents)
+        self.tick = grid.tick
+        return self.planes.ravel().tolist()
@@ -0,0 +1,317 @@
+import time
+
+import mesa
+
+from mesa_gym.common.fields import FieldLayer
+from mesa_gym.common.grid import PositionPlanes, TrackedMultiGrid
+from mesa_gym.common.percepts import Channel, PerceptConfig, PerceptCache
+from mesa_gym.common.registry import EntityRegistry
+from mesa_gym.common.scheduler import SimultaneousMoveActivation, TimerRandomActivation
+from mesa_gym.common.terrain import Terrain
+
+
+# kernel shared by the grid gyms: each gym extends the body of its agents and its world model,
+# and defines its entities, its symbols and the rules of the game through the hooks below
+
+
+#############################################
+# agent body (embedded in the environment)
+#############################################
+
+class GridAgentBody(mesa.Agent):
+    """Body of an agent of a grid world: perception, movement and reporting.
+
+    Gyms define what the agent pays attention to (`_get_relevant_entities`, or `_get_channels`),
+    what happens in its cell after the moves (`react`), and extend `act` with the conditions to act.
+    The mind of the agent is given by `mental_init` and `mental_step`."""
+
+    def __init__(self, unique_id, model):
+        super().__init__(unique_id, model)
+        self.mental_init()
+
+    def get_pos(self):
+        return self.pos
+
+    @staticmethod
+    def get_directions():
+        directions = []
+        for i in range(-1, 2):
+            for j in range (-1, 2):
+                directions.append((i, j))
+        return directions
+
+    def get_percepts(self, radius=None):
+        if self.pos is None: # case in which the agent has been destroyed # TODO, get percepts should not be called in this case!
+            return []
+
+        config = PerceptConfig(self._get_channels(),
+                               radius=self.model.percept_radius if radius is None else radius,
+                               coarse_levels=self.model.percept_levels)
+        return self.model.percept_cache.get(self, config)
+
+    def _get_channels(self):
+        relevant_entities = self._get_relevant_entities()
+
+        if relevant_entities is None:
+            raise RuntimeWarning("An agent has been initialized not paying attention to any entity.")
+
+        # one channel per relevant entity type, counting the entities in each cell of the field of view
+        return [Channel(entity_type) for entity_type in relevant_entities]
+
+    def _get_relevant_entities(self):
+        return None
+
+    def move(self, direction):
+        dx, dy = direction
+        absx, absy = self.pos
+        x = absx + dx
+        y = absy + dy
+        # with simultaneous moves, the move is resolved by the scheduler at the end of the phase
+        if not self.model.schedule.request_move(self, (x, y)):
+            if self.model.can_move(self, (x, y)):
+                self.model.grid.move_agent(self, (x, y))
+                self.moved(direction)
+            else:
+                self.move_failed()
+
+    def moved(self, direction):
+        pass
+
+    def move_failed(self):
+        self.model.events.append((self, False))
+        self.trace("action 'move' failed")
+
+    def act(self):
+        """Chooses and performs the action of the step; False if the agent cannot act (and does not react)."""
+        self.mental_step()
+        return True
+
+    def react(self):
+        pass
+
+    def step(self):
+        if self.act():
+            self.react()
+
+    def trace(self, text):
+        self.model.console.append(f"{type(self).__name__} {self.unique_id} > {text}".ljust(90, " "))
+
+    def destroy(self):
+        self.model.remove_entity(self)
+
+    def mental_init(self):
+        self.next_action = None
+
+    def mental_step(self):
+        if self.next_action is None:
+            self.next_action = self.random.choice(self.get_directions())
+        self.trace(f"next action: {self.next_action}")
+        self.move(self.next_action)
+        self.next_action = None
+
+    def show(self):
+        raise RuntimeError("Not defined symbol.")
+
+
+#######################
+# world
+#######################
+
+class GridWorldModel(mesa.Model):
+    """World of a grid gym: entities on a toroidal grid (see TrackedMultiGrid), with terrain and fields.
+
+    Gyms choose the type of grid (eg. HashedMultiGrid to observe the hash of the world) and the default
+    field of view of their agents, add their fields and extend `create_entity`, `add_entity`,
+    `remove_entity` and `step` with the rules of the game."""
+
+    grid_type = TrackedMultiGrid
+    # field of view of the agents (see mesa_gym.common.percepts)
+    percept_radius = 1
+    percept_levels = 0
+
+    def __init__(self, width, height, simultaneous=False):
+        super().__init__()
+        self.entities = EntityRegistry()
+        self.disabilities = {}
+        self.width = width
+        self.height = height
+        # with simultaneous moves, all the agents move from the positions at the start of the step
+        self.schedule = SimultaneousMoveActivation(self) if simultaneous else TimerRandomActivation(self)
+        self.grid = self.grid_type(width, height, True)
+        self.terrain = Terrain(width, height)
+        self.fields = FieldLayer(width, height)
+        self.positions = PositionPlanes(self)     # entities of each type in each cell, see get_positions
+        self.percept_cache = PerceptCache(self)
+        self.end = False
+        self.console = []
+        self.events = []
+
+    def step(self):
+        self.events = []
+        self.schedule.step()
+        self.fields.step()
+        return self.end, self.events
+
+    def get_positions(self):
+        return self.positions.get()
+
+    def get_state_hash(self):
+        """64-bit hash of the positions (as given by get_positions), maintained incrementally by a HashedMultiGrid."""
+        return self.grid.zobrist.value
+
+    def can_move(self, agent, pos):
+        """Whether the agent can move to `pos`: not blocked by the terrain, by a "move" disability of all agents,
+        nor by one of its own type if it leaves its cell (eg. two rangers cannot share a cell), as in
+        SimultaneousMoveActivation.resolve."""
+        pos = self.grid.torus_adj(pos)
+        if self.terrain.is_blocked(pos):
+            return False
+        for entity_type, disabilities in self.disabilities.items():
+            if entity_type is mesa.Agent or (isinstance(agent, entity_type) and pos != agent.pos):
+                if pos in [disabled() for disabled in disabilities.get("move", [])]:
+                    return False
+        return True
+
+    def create_entity(self, entity_type, x, y):
+        return entity_type(self.entities.next_id(), self, (x, y))
+
+    def add_entity(self, entity_type, x, y):
+        entity = self.create_entity(entity_type, x, y)
+        self.grid.place_agent(entity, (x, y))
+        self.schedule.add(entity)
+        self.entities.add(entity)
+        return entity
+
+    def add_entities(self, entity_type, xs, ys):
+        for x, y in zip(xs, ys):
+            self.add_entity(entity_type, int(x), int(y))
+
+    def add_terrain(self, terrain_type, x, y):
+        self.terrain.add(terrain_type, (x, y))
+
+    def add_disability(self, entity_type, action, callable_for_value):
+        if entity_type not in self.disabilities:
+            self.disabilities[entity_type] = {}
+        if action not in self.disabilities[entity_type]:
+            self.disabilities[entity_type][action] = []
+        self.disabilities[entity_type][action].append(callable_for_value)
+
+    def remove_entity(self, entity):
+        self.grid.remove_agent(entity)
+        self.schedule.remove(entity)
+        self.entities.remove(entity)
+
+    def remove_disability(self, entity_type, action, callable_for_value):
+        self.disabilities[entity_type][action].remove(callable_for_value)
+
+    def trace(self, text):
+        self.console.append(f">>>>>>> {text}".ljust(90, " "))
+
+
+#######################
+# viewer
+#######################
+
+def move(x, y):
+    print("\033[%d;%dH" % (y, x))
+
+
+class WorldView:
+    def __init__(self, world_model, fps=25, name=None):
+        self.world = world_model
+        if name is None:
+            self.name = "minimal gym built on top on mesa"
+        else:
+            self.name = name
+
+        # from frame per second (fps) toseconds per frame (ms)
+        # eg. 25 f/s = 1/25 s/f = 1000/25 ms/f = 40 ms/f
+        self.delay = 1/fps
+
+    def init(self):
+        print('\x1b[2J')
+
+    def header(self):
+        move(0, 0)
+        print(f"mesagym -- {self.name}\n")
+
+    def symbol(self, x, y):
+        """Symbol of a cell: the first agent in it, else its first entity, else its terrain."""
+        cell_content = self.world.grid.get_cell_list_contents((x, y))
+        for entity in cell_content:
+            if isinstance(entity, mesa.Agent):
+                return entity.show()
+        if cell_content:
+            return cell_content[0].show()
+        terrain_type = self.world.terrain.get_type((x, y))
+        if terrain_type is not None:
+            return terrain_type.show()
+        return " "
+
+    def render(self):
+        # for how mesa furnish the coordinate
+        # we have to print the transpose of the world
+        border = "|" + "-" * self.world.height + "|"
+        lines = [border]
+        for x in range(self.world.width):
+            lines.append("|" + "".join(self.symbol(x, y) for y in range(self.world.height)) + "|")
+        lines.append(border)
+        return "\n".join(lines) + "\n"
+
+    def show(self, reverse_order=False):
+        self.header()
+        print(self.render())
+
+        print(">>> console <<<")
+
+        if reverse_order:
+            console = reversed(self.world.console[-5:])
+        else:
+            console = self.world.console[-5:]
+        for item in console:
+            print(item)
+
+        time.sleep(self.delay)
+
+
+#######################
+# maps
+#######################
+
+def parse_map(map):
+    """Dimensions (inside the borders) of an ascii map, and its non-empty cells as (x, y, symbol):
+    x runs along the lines of the map, y along the characters of a line."""
+    # remove trailing new line at the beginning
+    if map[0] == "\n": map = map[1:]
+
+    width = map.index("\n") - 2  # accounting for the borders
+    if width == 0:
+        raise ValueError("Unexpected dimensions of the map.")
+
+    height = int(len(map) / (width + 3)) - 2  # accounting for the borders and newlines
+    if height == 0 or len(map) % (width + 3) != 0:
+        raise ValueError("Unexpected dimensions of the map.")
+
+    lines = map.split("\n")[1:height + 1]
+    cells = [(x, y, ch) for x, line in enumerate(lines) for y, ch in enumerate(line[1:width + 1]) if ch != " "]
+    return width, height, cells
+
+
+def create_world(map, symbol_type, model_type, **kwargs):
+    """World of the given type compiled from an ascii map, whose symbols are given by `symbol_type`
+    (see parse_map). Terrain types are compiled into the terrain of the world."""
+    width, height, cells = parse_map(map)
+    model = model_type(height, width, **kwargs)
+
+    # entity types are looked up once per symbol
+    entity_types = {}
+    for x, y, ch in cells:
+        if ch not in entity_types:
+            entity_types[ch] = symbol_type.symbol_to_entity(ch)
+        entity_type = entity_types[ch]
+        if Terrain.is_terrain(entity_type):
+            model.add_terrain(entity_type, x, y)
+        else:
+            model.add_entity(entity_type, x, y)
+
+    return model
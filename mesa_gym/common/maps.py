@@ -0,0 +1,250 @@
+import struct
+
+import numpy as np
+
+
+#######################
+# symbols of the gyms
+#######################
+
+# kept here as plain characters, so that maps can be generated without loading the worlds
+# (they must match the `Symbol` enums of the respective world.py)
+
+EMPTY = " "
+
+GOAL_WORLD = {"mouse": "☺", "cheese": "♠"}
+ZZT_BASIC = {"alice": "☻", "bob": "☺", "lion": "Ω", "wall": "█",
+             "somegrass": "░", "grass": "▒", "moregrass": "▓", "diamond": "♦"}
+SACRED_WATER = {"gatherer": "☺", "fruit": "σ",
+                "clean_water": "░", "poisoned_water": "▒", "very_poisoned_water": "▓"}
+LUMBERJACK = {"strong_lumberjack": "☻", "weak_lumberjack": "☺", "tree1": "1", "tree2": "2"}
+
+
+#######################
+# map generators
+#######################
+
+# maps are (height, width) arrays of symbols, one row per line of the ascii map;
+# the same seed always gives the same map
+
+def empty_map(width, height):
+    return np.full((height, width), EMPTY, dtype="<U1")
+
+
+def generate_goal_world(width, height, n_mice=1, n_cheeses=1, seed=None):
+    rng = np.random.default_rng(seed)
+    grid = empty_map(width, height)
+    place_entities(grid, rng, {GOAL_WORLD["mouse"]: n_mice, GOAL_WORLD["cheese"]: n_cheeses})
+    return grid
+
+
+def generate_zzt_basic(width, height, wall_density=0.5, grass_density=0.1, grass_radius=3,
+                       n_rangers=1, n_lions=1, n_diamonds=1, seed=None):
+    """Maze of walls (`wall_density` is the fraction of maze walls kept, 0 for no maze),
+    patches of grass covering about `grass_density` of the map, then the entities."""
+    rng = np.random.default_rng(seed)
+    grid = empty_map(width, height)
+
+    walls = maze(width, height, rng) & (rng.random((height, width)) < wall_density)
+    grid[walls] = ZZT_BASIC["wall"]
+
+    patches = blobs(width, height, grass_density, grass_radius, rng) & ~walls
+    grass = np.array([ZZT_BASIC["somegrass"], ZZT_BASIC["grass"], ZZT_BASIC["moregrass"]])
+    grid[patches] = grass[rng.integers(0, len(grass), size=int(patches.sum()))]
+
+    place_entities(grid, rng, {
+        ZZT_BASIC["bob"]: n_rangers,
+        ZZT_BASIC["lion"]: n_lions,
+        ZZT_BASIC["diamond"]: n_diamonds,
+    })
+    return grid
+
+
+def generate_sacred_water(width, height, lake_density=0.05, lake_radius=4, poisoned_lakes=0.3,
+                          orchard_density=0.05, orchard_radius=3, fruit_density=0.3,
+                          n_gatherers=1, seed=None):
+    """Lakes covering about `lake_density` of the map (a fraction `poisoned_lakes` of the water poisoned),
+    orchards covering about `orchard_density` of it, filled with fruits at `fruit_density`."""
+    rng = np.random.default_rng(seed)
+    grid = empty_map(width, height)
+
+    lakes = blobs(width, height, lake_density, lake_radius, rng)
+    waters = np.array([SACRED_WATER["clean_water"], SACRED_WATER["poisoned_water"], SACRED_WATER["very_poisoned_water"]])
+    # levels 0, 1 or 2, summed as integers (booleans would be or-ed)
+    poison = (rng.random((height, width)) < poisoned_lakes).astype(int) + \
+             (rng.random((height, width)) < poisoned_lakes / 2).astype(int)
+    grid[lakes] = waters[poison[lakes]]
+
+    orchards = blobs(width, height, orchard_density, orchard_radius, rng) & ~lakes
+    grid[orchards & (rng.random((height, width)) < fruit_density)] = SACRED_WATER["fruit"]
+
+    place_entities(grid, rng, {SACRED_WATER["gatherer"]: n_gatherers})
+    return grid
+
+
+def generate_lumberjack(width, height, tree_density=0.05, strong_trees=0.7,
+                        n_strong_lumberjacks=1, n_weak_lumberjacks=1, seed=None):
+    """Trees scattered over about `tree_density` of the map, a fraction `strong_trees` of them of strength 2."""
+    rng = np.random.default_rng(seed)
+    grid = empty_map(width, height)
+
+    n_trees = int(round(tree_density * width * height))
+    n_strong = int(round(n_trees * strong_trees))
+    place_entities(grid, rng, {
+        LUMBERJACK["strong_lumberjack"]: n_strong_lumberjacks,
+        LUMBERJACK["weak_lumberjack"]: n_weak_lumberjacks,
+        LUMBERJACK["tree1"]: n_trees - n_strong,
+        LUMBERJACK["tree2"]: n_strong,
+    })
+    return grid
+
+
+GENERATORS = {
+    "goal_world": generate_goal_world,
+    "zzt_basic": generate_zzt_basic,
+    "sacred_water": generate_sacred_water,
+    "lumberjack": generate_lumberjack,
+}
+
+
+def generate(gym, width, height, seed=None, **kwargs):
+    if gym not in GENERATORS:
+        raise RuntimeError("Unknown gym '%s'." % gym)
+    return GENERATORS[gym](width, height, seed=seed, **kwargs)
+
+
+#######################
+# building blocks
+#######################
+
+def place_entities(grid, rng, counts):
+    """Places the given number of each symbol on distinct empty cells, drawn at once."""
+    symbols = np.repeat(list(counts.keys()), list(counts.values())).astype("<U1")
+    free = np.flatnonzero(grid.ravel() == EMPTY)
+    if len(symbols) > len(free):
+        raise RuntimeError("Not valid value: the map has not enough free cells for the entities to be created.")
+    cells = rng.choice(free, size=len(symbols), replace=False)
+    grid.ravel()[cells] = rng.permutation(symbols)
+
+
+def maze(width, height, rng):
+    """Walls of a perfect maze built with the binary tree algorithm: rooms are the cells at odd
+    coordinates, and each room opens either towards north or towards west."""
+    walls = np.ones((height, width), dtype=bool)
+    rows = np.arange(1, height, 2)
+    cols = np.arange(1, width, 2)
+    walls[np.ix_(rows, cols)] = False
+
+    north = rng.random((len(rows), len(cols))) < 0.5
+    north[0, :] = False         # the first row can only open towards west
+    north[1:, 0] = True         # the first column can only open towards north
+    west = ~north
+    west[0, 0] = False
+
+    r, c = np.nonzero(north)
+    walls[rows[r] - 1, cols[c]] = False
+    r, c = np.nonzero(west)
+    walls[rows[r], cols[c] - 1] = False
+    return walls
+
+
+def blobs(width, height, density, radius, rng):
+    """Disks of the given radius, centered on random cells, covering about `density` of the map."""
+    area = width * height
+    disk = np.pi * radius ** 2
+    n_blobs = rng.poisson(-np.log(max(1 - density, 1e-9)) * area / disk) if density > 0 else 0
+
+    mask = np.zeros((height, width), dtype=bool)
+    if n_blobs == 0:
+        return mask
+    centers = np.zeros((height, width), dtype=bool)
+    centers.ravel()[rng.choice(area, size=min(n_blobs, area), replace=False)] = True
+
+    # dilation of the centers by the disk, one shifted copy per offset
+    for dx in range(-radius, radius + 1):
+        for dy in range(-radius, radius + 1):
+            if dx * dx + dy * dy <= radius * radius:
+                mask |= np.roll(centers, (dx, dy), axis=(0, 1))
+    return mask
+
+
+#######################
+# formats
+#######################
+
+def to_ascii(grid):
+    """Map in the ascii format read by the worlds, with borders."""
+    height, width = grid.shape
+    border = "|" + "-" * width + "|\n"
+    lines = ["|" + "".join(row) + "|\n" for row in grid]
+    return "\n" + border + "".join(lines) + border
+
+
+def from_ascii(map):
+    if map[0] == "\n": map = map[1:]
+    lines = map.rstrip("\n").split("\n")[1:-1]
+    return np.array([list(line[1:-1]) for line in lines], dtype="<U1")
+
+
+# binary layout: magic, version, height, width, number of symbols (little-endian uint32),
+# the symbols (utf-32, one per code), then one uint8 code per cell, row by row
+
+MAGIC = b"MGYM"
+VERSION = 1
+HEADER = struct.Struct("<4sIIII")
+
+
+def to_binary(grid):
+    palette, codes = np.unique(grid, return_inverse=True)
+    if len(palette) > 256:
+        raise RuntimeError("Too many symbols for the binary format.")
+    height, width = grid.shape
+    header = HEADER.pack(MAGIC, VERSION, height, width, len(palette))
+    symbols = "".join(palette).encode("utf-32-le")
+    return header + symbols + codes.astype(np.uint8).tobytes()
+
+
+def from_binary(data):
+    magic, version, height, width, n_symbols = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise RuntimeError("Not a map in binary format.")
+    offset = HEADER.size
+    palette = np.array(list(bytes(data[offset:offset + 4 * n_symbols]).decode("utf-32-le")), dtype="<U1")
+    offset += 4 * n_symbols
+    codes = np.frombuffer(data, dtype=np.uint8, count=height * width, offset=offset)
+    return palette[codes].reshape(height, width)
+
+
+def save(grid, path, binary=False):
+    if binary:
+        with open(path, "wb") as f:
+            f.write(to_binary(grid))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(to_ascii(grid))
+
+
+def load(path):
+    """Loads a map saved in any of the two formats, returning it in ascii format."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] == MAGIC:
+        return to_ascii(from_binary(data))
+    return data.decode("utf-8")
+
+
+#######################
+# main
+#######################
+
+if __name__ == "__main__":
+
+    for gym in GENERATORS:
+        print(gym)
+        print(to_ascii(generate(gym, 40, 12, seed=42)))
+
+    # all the levels of poison of the water are generated
+    grid = generate("sacred_water", 60, 60, seed=1, lake_density=0.5, poisoned_lakes=0.9)
+    for water in ("clean_water", "poisoned_water", "very_poisoned_water"):
+        if not (grid == SACRED_WATER[water]).any():
+            raise RuntimeError(f"No {water} generated.")
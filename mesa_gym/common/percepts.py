@@ -0,0 +1,198 @@
+import functools
+
+import numpy as np
+
+from mesa_gym.common.terrain import Terrain
+
+
+#######################
+# configuration
+#######################
+
+class Channel:
+    """Entities perceived together. The value of a cell is the number of entities of the given types
+    in it, or the sum of their `weight` attribute (integer) if given. Terrain types count their mask."""
+
+    def __init__(self, *types, weight=None):
+        self.types = types
+        self.weight = weight
+
+
+class PerceptConfig:
+    """Field of view of an agent: for each channel, the cells within `radius` (Chebyshev distance,
+    wrapping around the torus), then for each coarse level the 8 blocks around the previous window,
+    3 times larger at each level, whose values are pooled (summed)."""
+
+    def __init__(self, channels, radius=1, coarse_levels=0):
+        self.channels = list(channels)
+        self.radius = radius
+        self.coarse_levels = coarse_levels
+
+    @property
+    def n_features(self):
+        return len(self.channels) * ((2 * self.radius + 1) ** 2 + 8 * self.coarse_levels)
+
+
+#######################
+# offset tables
+#######################
+
+def view_offsets(radius, coarse_levels=0):
+    """Offsets (dx, dy) of the cells in the field of view, and the start of each pooled block among them.
+
+    The fine cells come first, ordered by dx then dy, one feature each; then the cells of the blocks of
+    each coarse level, block after block (same order)."""
+    side = 2 * radius + 1
+    fine = np.arange(-radius, radius + 1)
+    dx = [np.repeat(fine, side)]
+    dy = [np.tile(fine, side)]
+    starts = []
+    n = side * side
+    for level in range(coarse_levels):
+        block = side * 3 ** level          # side of the blocks, odd
+        half = block // 2
+        inner = np.arange(-half, half + 1)
+        for i in (-1, 0, 1):
+            for j in (-1, 0, 1):
+                if i == 0 and j == 0:
+                    continue
+                dx.append(i * block + np.repeat(inner, block))
+                dy.append(j * block + np.tile(inner, block))
+                starts.append(n)
+                n += block * block
+    return np.concatenate(dx), np.concatenate(dy), np.array(starts, dtype=int)
+
+
+@functools.lru_cache(maxsize=64)
+def offset_tables(width, height, radius, coarse_levels=0):
+    """Wrap-around index tables of the field of view on a grid: the cells seen from (x, y) are
+    `xs[x] + ys[y]`, indexes in planes flattened as x * height + y. Computed once per grid size."""
+    dx, dy, starts = view_offsets(radius, coarse_levels)
+    xs = ((np.arange(width)[:, None] + dx[None, :]) % width) * height
+    ys = (np.arange(height)[:, None] + dy[None, :]) % height
+    return xs, ys, starts
+
+
+@functools.lru_cache(maxsize=64)
+def block_starts(radius, coarse_levels):
+    return view_offsets(radius, coarse_levels)[2]
+
+
+#######################
+# percepts
+#######################
+
+def channel_planes(model, channels):
+    """Values of the channels in each cell, as (n_channels, width * height) planes (cell x * height + y)."""
+    size = model.width * model.height
+    planes = np.zeros((len(channels), size), dtype=np.int64)
+    for c, channel in enumerate(channels):
+        entity_types = []
+        for entity_type in channel.types:
+            if Terrain.is_terrain(entity_type):
+                planes[c] += model.terrain.get_mask(entity_type).ravel()
+            else:
+                entity_types.append(entity_type)
+        if not entity_types:
+            continue
+        entities = model.entities.of_type(*entity_types)
+        if not entities:
+            continue
+        cells = [x * model.height + y for x, y in (entity.pos for entity in entities)]
+        weights = 1 if channel.weight is None else [getattr(entity, channel.weight) for entity in entities]
+        np.add.at(planes[c], cells, weights)
+    return planes
+
+
+def cell_values(model, channels, pos):
+    """Values of the channels in a single cell."""
+    contents = model.grid.get_cell_list_contents(pos)
+    values = []
+    for channel in channels:
+        value = 0
+        for entity_type in channel.types:
+            if Terrain.is_terrain(entity_type):
+                value += model.terrain.count(entity_type, pos)
+        entity_types = tuple(entity_type for entity_type in channel.types if not Terrain.is_terrain(entity_type))
+        for entity in contents:
+            if isinstance(entity, entity_types):
+                value += 1 if channel.weight is None else getattr(entity, channel.weight)
+        values.append(value)
+    return values
+
+
+def pool(values, config):
+    """Features from the values of the cells of the field of view, (n_channels, n_cells)."""
+    if config.coarse_levels == 0:
+        return values.ravel()
+    starts = block_starts(config.radius, config.coarse_levels)
+    n_fine = (2 * config.radius + 1) ** 2
+    pooled = np.add.reduceat(values, starts, axis=1)
+    return np.concatenate([values[:, :n_fine], pooled], axis=1).ravel()
+
+
+def window(width, height, pos, config):
+    """Indexes of the cells of the field of view from `pos`, in planes flattened as x * height + y."""
+    xs, ys, _ = offset_tables(width, height, config.radius, config.coarse_levels)
+    x, y = pos
+    return xs[x] + ys[y]
+
+
+def gather(planes, width, height, pos, config):
+    """Percepts from `pos`, given the planes of the channels (see channel_planes)."""
+    return pool(planes[:, window(width, height, pos, config)], config)
+
+
+def perceive(model, pos, config):
+    """Percepts of an agent at `pos`, as a list: for each channel in turn, the fine cells then the pooled blocks."""
+    planes = channel_planes(model, config.channels)
+    return gather(planes, model.width, model.height, pos, config).tolist()
+
+
+#######################
+# cache
+#######################
+
+class PerceptCache:
+    """Percepts of the agents of a world whose grid is a TrackedMultiGrid, recomputed only when needed.
+
+    The planes of the channels are updated only in the cells changed since they were last used, and
+    the percepts of an agent are reused as long as it has not moved and no cell of its field of view changed:
+    in sparse worlds, most agents perceive in constant time."""
+
+    def __init__(self, model):
+        self.model = model
+        self._planes = {}       # channels -> [tick, planes]
+        self._percepts = {}     # unique id -> (pos, configuration, tick, percepts)
+
+    @staticmethod
+    def _channels_key(channels):
+        return tuple((channel.types, channel.weight) for channel in channels)
+
+    def planes(self, channels):
+        grid = self.model.grid
+        key = self._channels_key(channels)
+        cached = self._planes.get(key)
+        if cached is None:
+            cached = self._planes[key] = [grid.tick, channel_planes(self.model, channels)]
+        elif cached[0] < grid.tick:
+            xs, ys = grid.changed_since(cached[0])
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                cached[1][:, x * self.model.height + y] = cell_values(self.model, channels, (x, y))
+            cached[0] = grid.tick
+        return cached[1]
+
+    def get(self, agent, config):
+        """Percepts of an agent (see perceive)."""
+        grid = self.model.grid
+        cells = window(self.model.width, self.model.height, agent.pos, config)
+        key = (config.radius, config.coarse_levels, self._channels_key(config.channels))
+
+        cached = self._percepts.get(agent.unique_id)
+        if cached is not None and cached[0] == agent.pos and cached[1] == key:
+            if cached[2] == grid.tick or grid.changed_at[cells].max() <= cached[2]:
+                return list(cached[3])
+
+        percepts = pool(self.planes(config.channels)[:, cells], config).tolist()
+        self._percepts[agent.unique_id] = (agent.pos, key, grid.tick, percepts)
+        return list(percepts)
@@ -0,0 +1,170 @@
+import numpy as np
+
+
+#######################
+# counterfactual observations
+#######################
+
+# the observations of goal_world and sacred_water are the concatenation of one plane per
+# entity type, with the number of entities of that type in each cell (cell x + y * width);
+# a policy map gives the best action and its value for the agent placed in each cell,
+# everything else being unchanged
+
+def find_plane(obs, width, height, pos):
+    """Index of the plane of the agent at `pos` (the first plane having an entity there)."""
+    size = width * height
+    x, y = pos
+    for plane in range(len(obs) // size):
+        if obs[plane * size + x + y * width] >= 1:
+            return plane
+    raise RuntimeError("Wrong reverse engineering of obs")
+
+
+def base_observation(obs, width, height, pos, plane):
+    """Observation without the agent: counterfactual observations add it back in each cell."""
+    base = np.array(obs, dtype=np.float32)
+    x, y = pos
+    base[plane * width * height + x + y * width] -= 1
+    return base
+
+
+def counterfactual_observations(base, width, height, plane, cells=None):
+    """Batch of observations with the agent in each of the `cells` (all the cells by default)."""
+    size = width * height
+    cells = np.arange(size) if cells is None else np.asarray(cells)
+    observations = np.repeat(base[None, :], len(cells), axis=0)
+    observations[np.arange(len(cells)), plane * size + cells] += 1
+    return observations
+
+
+def to_maps(best_actions, values, width, height):
+    # from cells (x + y * width) to maps indexed by [x, y]
+    return best_actions.reshape(height, width).T, values.reshape(height, width).T
+
+
+#######################
+# policy maps
+#######################
+
+def q_table_policy_map(q_table, obs, width, height, pos, plane=None):
+    """Best actions and values for the agent in each cell, gathered from a Q-table (dict or QTable).
+
+    Instead of building all the observations, the table is scanned once for the states equal to the
+    base observation but for one agent added in its plane. Returns (width, height) arrays, with
+    action -1 and value NaN for the cells whose state is not in the table."""
+
+    size = width * height
+    plane = find_plane(obs, width, height, pos) if plane is None else plane
+    base = base_observation(obs, width, height, pos, plane).astype(np.float64)
+
+    if hasattr(q_table, "keys") and isinstance(q_table.keys, np.ndarray):
+        keys, values = q_table.keys, q_table.values
+    else:
+        keys = np.array([tuple(state) for state in q_table.keys()], dtype=np.float64)
+        values = np.array(list(q_table.values()))
+
+    best_actions = np.full(size, -1)
+    best_values = np.full(size, np.nan)
+    if keys.ndim != 2 or keys.shape[1] != len(base):
+        return to_maps(best_actions, best_values, width, height)
+
+    start, end = plane * size, (plane + 1) * size
+    others = np.ones(len(base), dtype=bool)
+    others[start:end] = False
+
+    chunk = max(1, 2 ** 24 // len(base))
+    for first in range(0, len(keys), chunk):
+        block = np.asarray(keys[first:first + chunk])
+        match = (block[:, others] == base[others]).all(axis=1)
+        difference = block[match, start:end] - base[start:end]
+        added = (difference.sum(axis=1) == 1) & (difference.min(axis=1) == 0)
+        cells = np.argmax(difference[added], axis=1)
+        q_values = np.asarray(values[first:first + chunk])[match][added]
+        best_actions[cells] = np.argmax(q_values, axis=1)
+        best_values[cells] = np.max(q_values, axis=1)
+
+    return to_maps(best_actions, best_values, width, height)
+
+
+def dqn_policy_map(model, obs, width, height, pos, plane=None, device=None, batch_size=None):
+    """Best actions and values for the agent in each cell, evaluated by a DQN model on batches of
+    counterfactual observations (one forward pass when they fit in `batch_size`). Returns (width, height) arrays."""
+    import torch
+    from mesa_gym.trainers.DQN import DQN
+
+    size = width * height
+    plane = find_plane(obs, width, height, pos) if plane is None else plane
+    base = base_observation(obs, width, height, pos, plane)
+
+    # batches of about 64MB of observations
+    batch_size = batch_size or max(1, 2 ** 24 // len(base))
+
+    best_actions = np.empty(size, dtype=int)
+    best_values = np.empty(size)
+    with torch.no_grad():
+        for first in range(0, size, batch_size):
+            cells = np.arange(first, min(first + batch_size, size))
+            if isinstance(model, DQN):
+                # dense first layer: the observations need not be built
+                q_values = _forward_one_hot(model, base, plane * size + cells, device)
+            else:
+                observations = torch.from_numpy(counterfactual_observations(base, width, height, plane, cells))
+                if device is not None:
+                    observations = observations.to(device)
+                q_values = model(observations)
+            values, actions = q_values.max(1)
+            best_actions[cells] = actions.cpu().numpy()
+            best_values[cells] = values.cpu().numpy()
+
+    return to_maps(best_actions, best_values, width, height)
+
+
+def _forward_one_hot(model, base, features, device=None):
+    """Forward pass of a DQN model on base + one-hot(feature) for each feature: the outputs of its first
+    (linear) layer are W.base + b + W[:, feature], computed without building the inputs."""
+    import torch
+    import torch.nn.functional as F
+
+    weight = model.layer1.weight
+    base = torch.from_numpy(base).to(weight.device if device is None else device)
+    features = torch.from_numpy(features).to(base.device)
+    hidden = F.relu(model.layer1(base.unsqueeze(0)) + weight[:, features].T)
+
+    # the rest of the forward pass of DQN
+    hidden = F.relu(model.layer2(hidden))
+    return model.layer3(hidden)
+
+
+def policy_map(model, obs, width, height, pos, plane=None, **kwargs):
+    """Policy map of a Q-table or of a DQN model (torch module)."""
+    if callable(model) and not hasattr(model, "keys"):
+        return dqn_policy_map(model, obs, width, height, pos, plane, **kwargs)
+    return q_table_policy_map(model, obs, width, height, pos, plane)
+
+
+#######################
+# exports
+#######################
+
+def export_heatmaps(best_actions, values, directions, filename, title=None):
+    """Saves the values as a heatmap, with the best actions drawn as arrows ((dx, dy) of each action)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    width, height = values.shape
+    directions = np.asarray(directions, dtype=float)
+    known = best_actions >= 0
+    dx = np.where(known, directions[best_actions, 0], 0)
+    dy = np.where(known, directions[best_actions, 1], 0)
+
+    # x is drawn as rows, as in the text views of the worlds
+    fig, ax = plt.subplots(figsize=(max(4, height / 8), max(4, width / 8)))
+    image = ax.imshow(values, cmap="viridis", origin="upper")
+    rows, cols = np.meshgrid(np.arange(width), np.arange(height), indexing="ij")
+    ax.quiver(cols[known], rows[known], dy[known], -dx[known], color="white", scale_units="xy", scale=1.5, width=0.002)
+    fig.colorbar(image, ax=ax)
+    if title is not None:
+        ax.set_title(title)
+    fig.savefig(filename, dpi=100, bbox_inches="tight")
+    plt.close(fig)
@@ -0,0 +1,87 @@
+import heapq
+
+
+class EntityRegistry:
+    """Live entities of a world, indexed by unique id and by type.
+
+    Adding and removing entities takes constant time, and entities of the same type
+    are kept in insertion order. Ids are never reused unless `recycle_ids` is set,
+    in which case the smallest id released by a removed entity is given first.
+    Types stay known to the registry even when all their entities are removed,
+    so that observations built per type keep the same shape."""
+
+    def __init__(self, recycle_ids=False, compaction_threshold=1024):
+        self.recycle_ids = recycle_ids
+        self.compaction_threshold = compaction_threshold
+        self._entities = {}
+        self._by_type = {}
+        self._order = {}        # insertion counter of each id, to merge several types in order
+        self._counter = 0
+        self._next_id = 0
+        self._free_ids = []
+        self._removals = 0
+
+    def next_id(self):
+        if self.recycle_ids:
+            # ids may have been taken explicitly in the meantime
+            while self._free_ids and self._free_ids[0] in self._entities:
+                heapq.heappop(self._free_ids)
+            if self._free_ids:
+                return self._free_ids[0]
+        return self._next_id
+
+    def add(self, entity):
+        unique_id = entity.unique_id
+        if unique_id in self._entities:
+            raise RuntimeError(f"Entity with id {unique_id} already registered.")
+        if self._free_ids and self._free_ids[0] == unique_id:
+            heapq.heappop(self._free_ids)
+        self._next_id = max(self._next_id, unique_id + 1)
+
+        self._entities[unique_id] = entity
+        self._by_type.setdefault(type(entity), {})[unique_id] = entity
+        self._order[unique_id] = self._counter
+        self._counter += 1
+
+    def remove(self, entity):
+        unique_id = entity.unique_id
+        del self._entities[unique_id]
+        del self._by_type[type(entity)][unique_id]
+        del self._order[unique_id]
+        if self.recycle_ids:
+            heapq.heappush(self._free_ids, unique_id)
+
+        self._removals += 1
+        if self._removals > max(self.compaction_threshold, len(self._entities)):
+            self.compact()
+
+    def compact(self):
+        """Rebuilds the indexes, releasing the memory left by removed entities."""
+        self._entities = dict(self._entities)
+        self._by_type = {entity_type: dict(entities) for entity_type, entities in self._by_type.items()}
+        self._order = dict(self._order)
+        self._removals = 0
+
+    def get(self, unique_id):
+        return self._entities.get(unique_id)
+
+    def types(self):
+        return list(self._by_type.keys())
+
+    def of_type(self, *entity_types):
+        """Live entities that are instances of the given types, in insertion order."""
+        groups = [entities for known_type, entities in self._by_type.items() if issubclass(known_type, entity_types)]
+        if len(groups) == 1:
+            return list(groups[0].values())
+        selected = [entity for entities in groups for entity in entities.values()]
+        selected.sort(key=lambda entity: self._order[entity.unique_id])
+        return selected
+
+    def __iter__(self):
+        return iter(list(self._entities.values()))
+
+    def __len__(self):
+        return len(self._entities)
+
+    def __contains__(self, entity):
+        return self._entities.get(entity.unique_id) is entity
@@ -0,0 +1,188 @@
+import heapq
+
+import mesa
+import numpy as np
+
+
+class TimerRandomActivation(mesa.time.RandomActivation):
+    """Random activation that only steps the entities that are awake.
+
+    Entities can declare themselves passive with a class attribute `passive = True`
+    (eg. walls, trees, diamonds): they are not kept in the schedule, and never stepped.
+    Any entity can also be put to sleep until a given tick, or until it is woken up
+    explicitly. Sleeping entities are kept in a heap of timers, so that at each step
+    only the awake entities are shuffled and activated."""
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._awake = {}
+        self._timers = []       # heap of (tick, counter, unique_id)
+        self._wake_ticks = {}   # last timer set for an entity, older timers are ignored
+        self._counter = 0
+
+    def add(self, agent):
+        if getattr(agent, "passive", False):
+            return
+        super().add(agent)
+        self._awake[agent.unique_id] = agent
+
+    def remove(self, agent):
+        if getattr(agent, "passive", False):
+            return
+        super().remove(agent)
+        self._awake.pop(agent.unique_id, None)
+        self._wake_ticks.pop(agent.unique_id, None)
+
+    def sleep(self, agent, until=None):
+        """Stops stepping the agent until the tick `until` (or until `wake` is called if None)."""
+        self._awake.pop(agent.unique_id, None)
+        if until is None:
+            self._wake_ticks.pop(agent.unique_id, None)
+        else:
+            self._wake_ticks[agent.unique_id] = until
+            heapq.heappush(self._timers, (until, self._counter, agent.unique_id))
+            self._counter += 1
+
+    def wake(self, agent):
+        """Steps the agent again starting from the next activation."""
+        if agent.unique_id in self._agents:
+            self._wake_ticks.pop(agent.unique_id, None)
+            self._awake[agent.unique_id] = agent
+
+    def is_awake(self, agent):
+        return agent.unique_id in self._awake
+
+    def get_awake_count(self):
+        return len(self._awake)
+
+    def request_move(self, agent, pos):
+        """Moves are applied at once with this activation: returns False, the agent moves itself."""
+        return False
+
+    def _wake_up(self):
+        while self._timers and self._timers[0][0] <= self.steps:
+            tick, _, unique_id = heapq.heappop(self._timers)
+            if self._wake_ticks.get(unique_id) == tick:
+                del self._wake_ticks[unique_id]
+                self._awake[unique_id] = self._agents[unique_id]
+
+    def _shuffled_keys(self):
+        agent_keys = list(self._awake.keys())
+        self.model.random.shuffle(agent_keys)
+        return agent_keys
+
+    def step(self):
+        self._wake_up()
+
+        # entities may be removed or put to sleep by others during the step
+        for agent_key in self._shuffled_keys():
+            if agent_key in self._awake:
+                self._awake[agent_key].step()
+
+        self.steps += 1
+        self.time += 1
+
+
+class SimultaneousMoveActivation(TimerRandomActivation):
+    """Activation in which the awake agents move simultaneously, from the positions at the start of the step.
+
+    The step has three phases. First each agent chooses its action with `act()` (returning False if it
+    does not act), and its moves are only recorded (see `request_move`). The moves are then resolved
+    together: a move fails if its target is blocked by the terrain or by a disability of all agents
+    (as for sequential moves), and agents of a type with a "move" disability (eg. rangers, lions)
+    cannot end up in the same cell as another agent of that type. When several of them target the same
+    cell, the first activated wins; the activation order is shuffled with the random generator of the
+    model, so the outcome is deterministic given its seed. Finally the positions are committed in bulk,
+    `moved(direction)` or `move_failed()` is called on each agent that requested a move, and `react()`
+    on the agents that acted and are still in the world, in activation order."""
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._requests = None   # (agent, pos) recorded during the first phase
+
+    def request_move(self, agent, pos):
+        """Records the move of the agent towards `pos`, to be resolved at the end of the first phase."""
+        if self._requests is None:
+            return False
+        self._requests.append((agent, pos))
+        return True
+
+    def step(self):
+        self._wake_up()
+
+        self._requests = []
+        acted = []
+        for agent_key in self._shuffled_keys():
+            if agent_key in self._awake and self._awake[agent_key].act():
+                acted.append(self._awake[agent_key])
+        requests, self._requests = self._requests, None
+
+        if requests:
+            agents = [agent for agent, _ in requests]
+            directions = [(x - agent.pos[0], y - agent.pos[1]) for agent, (x, y) in requests]
+            targets, success = self.resolve(requests)
+            moving = [i for i in np.flatnonzero(success).tolist() if targets[i] != agents[i].pos]
+            for i in moving:
+                self.model.grid.remove_agent(agents[i])
+            for i in moving:
+                self.model.grid.place_agent(agents[i], targets[i])
+            for i, agent in enumerate(agents):
+                if success[i]:
+                    agent.moved(directions[i])
+                else:
+                    agent.move_failed()
+
+        for agent in acted:
+            if agent.pos is not None:
+                agent.react()
+
+        self.steps += 1
+        self.time += 1
+
+    def resolve(self, requests):
+        """Targets of the requested moves (wrapped around the torus) and whether each move succeeds."""
+        model = self.model
+        width, height = model.grid.width, model.grid.height
+        agents = [agent for agent, _ in requests]
+        sources = np.array([agent.pos for agent in agents]).reshape(-1, 2)
+        targets = np.array([pos for _, pos in requests]).reshape(-1, 2)
+
+        if model.grid.torus:
+            targets = targets % (width, height)
+            inside = np.ones(len(requests), dtype=bool)
+        else:
+            inside = (targets >= 0).all(axis=1) & (targets < (width, height)).all(axis=1)
+            targets = np.clip(targets, 0, (width - 1, height - 1))
+        src = sources[:, 0] * height + sources[:, 1]
+        dst = targets[:, 0] * height + targets[:, 1]
+        moving = src != dst
+
+        success = inside & ~model.terrain.blocked[targets[:, 0], targets[:, 1]]
+        disabled = self._disabled_cells(mesa.Agent)
+        if len(disabled):
+            success &= ~np.isin(dst, disabled)
+
+        # same-type exclusion, until no more move fails: failed moves keep their cell occupied
+        exclusive = [entity_type for entity_type in model.disabilities if entity_type is not mesa.Agent]
+        of_type = [np.array([isinstance(agent, entity_type) for agent in agents]) & moving for entity_type in exclusive]
+        holders = [np.bincount(self._disabled_cells(entity_type), minlength=width * height) for entity_type in exclusive]
+        changed = True
+        while changed:
+            before = success.copy()
+            for movers, held in zip(of_type, holders):
+                candidates = np.flatnonzero(movers & success)
+                # first activated mover of each target cell
+                _, first = np.unique(dst[candidates], return_index=True)
+                success[np.setdiff1d(candidates, candidates[first])] = False
+                left = movers & success
+                occupied = held - np.bincount(src[left], minlength=width * height)
+                success[left & (occupied[dst] > 0)] = False
+            changed = (success != before).any()
+
+        return [tuple(target) for target in targets.tolist()], success
+
+    def _disabled_cells(self, entity_type):
+        """Cells given by the "move" disabilities of a type, at the start of the resolution."""
+        callables = self.model.disabilities.get(entity_type, {}).get("move", [])
+        positions = [pos for pos in (disabled() for disabled in callables) if pos is not None]
+        return np.array([x * self.model.grid.height + y for x, y in positions], dtype=np.int64)
@@ -0,0 +1,125 @@
+import numpy as np
+from gymnasium import spaces
+
+
+#######################
+# symmetries of a torus
+#######################
+
+# transforms of the relative coordinates (dx, dy), as 2x2 matrices: the translations of the torus
+# are removed by centring the observations on an agent, these add reflections and rotations
+IDENTITY = [((1, 0), (0, 1))]
+REFLECTIONS = [((sx, 0), (0, sy)) for sx in (1, -1) for sy in (1, -1)]
+DIHEDRAL = REFLECTIONS + [((0, sx), (sy, 0)) for sx in (1, -1) for sy in (1, -1)]
+
+SYMMETRIES = {
+    "translation": IDENTITY,
+    "reflection": REFLECTIONS,      # only when rewards do not depend on the orientation
+    "dihedral": DIHEDRAL,           # idem, and on square grids only
+}
+
+
+class Canonicalizer:
+    """Canonical form of the observations of a toroidal grid world, up to its symmetries.
+
+    Observations are planes of cells (cell x + y * width, as given by get_positions). They are
+    re-centred on the position of an agent, which ends up in cell 0, then the transform giving the
+    smallest observation (in byte order) is kept among the other symmetries. Actions chosen in the
+    canonical frame are mapped back to the world with the same transform."""
+
+    def __init__(self, width, height, directions, symmetries="translation"):
+        if symmetries not in SYMMETRIES:
+            raise RuntimeError(f"Unknown symmetries '{symmetries}'.")
+        matrices = [np.array(matrix) for matrix in SYMMETRIES[symmetries]]
+        if width != height and any(matrix[0, 0] == 0 for matrix in matrices):
+            raise RuntimeError("Rotations of the observations require a square grid.")
+
+        self.width = width
+        self.height = height
+        self.size = width * height
+
+        # offsets from the agent of the cell seen in each canonical cell, for each transform:
+        # canonical cell c = M (p - pos), so p - pos = M^-1 c = M^T c
+        cells = np.arange(self.size)
+        cx, cy = cells % width, cells // width
+        self.offsets = [(matrix[0, 0] * cx + matrix[1, 0] * cy, matrix[0, 1] * cx + matrix[1, 1] * cy) for matrix in matrices]
+
+        # index of each action once mapped to the world (M^-1 direction), and back
+        directions = [tuple(direction) for direction in directions]
+        self.world_actions = []
+        self.canonical_actions = []
+        for matrix in matrices:
+            mapped = [tuple(int(v) for v in matrix.T @ np.array(direction)) for direction in directions]
+            if sorted(mapped) != sorted(directions):
+                raise RuntimeError("The actions are not closed under the symmetries.")
+            world_actions = np.array([directions.index(direction) for direction in mapped])
+            self.world_actions.append(world_actions)
+            self.canonical_actions.append(np.argsort(world_actions))
+
+    def canonical(self, obs, pos):
+        """Canonical observation centred on `pos`, and the index of the transform applied."""
+        planes = np.asarray(obs).reshape(-1, self.size)
+        x, y = pos
+        candidates = [planes[:, (x + dx) % self.width + ((y + dy) % self.height) * self.width].ravel()
+                      for dx, dy in self.offsets]
+        if len(candidates) == 1:
+            return candidates[0], 0
+        best = min(range(len(candidates)), key=lambda i: candidates[i].tobytes())
+        return candidates[best], best
+
+    def to_world_action(self, action, transform):
+        return int(self.world_actions[transform][action])
+
+    def to_canonical_action(self, action, transform):
+        return int(self.canonical_actions[transform][action])
+
+
+#######################
+# environment
+#######################
+
+class CanonicalEnv:
+    """Environment observed up to the symmetries of its torus (see Canonicalizer).
+
+    It wraps a grid environment observed as a whole (goal_world, sacred_water): each agent gets
+    its own canonical observation, centred on itself, and its actions are taken in that frame.
+    Observations are thus dicts keyed by `unique_id`, and states equal up to a translation
+    (and a reflection or rotation, if enabled) share the same entries in Q-tables or replay memories."""
+
+    def __init__(self, env, symmetries="translation"):
+        if getattr(env, "hashed_obs", False):
+            raise RuntimeError("Hashed observations cannot be canonicalized.")
+        self.env = env
+        self.canonicalizer = Canonicalizer(env.model.width, env.model.height, env.potential_actions, symmetries)
+        self.info_fields = env.info_fields
+        self.action_space = env.action_space
+        self.observation_space = spaces.Dict({unique_id: env.observation_space for unique_id in env.action_space.keys()})
+        self.transforms = {}
+
+    def reset(self, seed=None, options=None):
+        observation, info = self.env.reset(seed=seed, options=options)
+        return self._get_obs(observation), info
+
+    def step(self, actions):
+        world_actions = {}
+        for unique_id, action in actions.items():
+            if unique_id in self.transforms:
+                action = self.canonicalizer.to_world_action(action, self.transforms[unique_id])
+            world_actions[unique_id] = action
+
+        observation, rewards, terminated, truncated, info = self.env.step(world_actions)
+        return self._get_obs(observation), rewards, terminated, truncated, info
+
+    def _get_obs(self, observation):
+        observations = {}
+        self.transforms = {}
+        for agent in self.env._get_agents():
+            if agent.pos is not None:
+                observations[agent.unique_id], self.transforms[agent.unique_id] = self.canonicalizer.canonical(observation, agent.pos)
+        return observations
+
+    def _get_agents(self):
+        return self.env._get_agents()
+
+    def close(self):
+        self.env.close()
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+class Terrain:
+    """Immovable, non-interactive elements of the map (eg. walls).
+
+    Instead of being agents placed on the grid and stepped by the scheduler, terrain
+    elements are compiled at loading time into one boolean mask per terrain type.
+    Terrain types are classes declaring `terrain = True`, and `blocking = True` if
+    agents cannot move onto them."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.masks = {}
+        self.blocked = np.zeros((width, height), dtype=bool)
+
+    @staticmethod
+    def is_terrain(entity_type):
+        return getattr(entity_type, "terrain", False)
+
+    def add(self, terrain_type, pos):
+        if terrain_type not in self.masks:
+            self.masks[terrain_type] = np.zeros((self.width, self.height), dtype=bool)
+        self.masks[terrain_type][pos] = True
+        if getattr(terrain_type, "blocking", False):
+            self.blocked[pos] = True
+
+    def is_blocked(self, pos):
+        return bool(self.blocked[pos])
+
+    def count(self, terrain_type, pos):
+        if terrain_type not in self.masks:
+            return 0
+        return int(self.masks[terrain_type][pos])
+
+    def get_type(self, pos):
+        for terrain_type, mask in self.masks.items():
+            if mask[pos]:
+                return terrain_type
+        return None
+
+    def get_mask(self, terrain_type):
+        if terrain_type not in self.masks:
+            return np.zeros((self.width, self.height), dtype=bool)
+        return self.masks[terrain_type]
@@ -0,0 +1,67 @@
+import hashlib
+
+from mesa_gym.common.grid import TrackedMultiGrid
+
+
+class ZobristHash:
+    """Incremental 64-bit (Zobrist) hash of the state of a world.
+
+    Each item of the state (the k-th entity of a type in a cell, the value of a scalar) has a
+    pseudo-random 64-bit key, and the hash is the XOR of the keys of the items present: adding
+    or removing an item is a single XOR, whatever the size of the world. Keys are derived from
+    the items themselves, so the same state has the same hash in every process and every run."""
+
+    def __init__(self, salt=b""):
+        self.salt = salt
+        self.value = 0
+        self._keys = {}
+        self._counts = {}       # (type name, cell) -> number of entities
+        self._scalars = {}
+
+    def key(self, *item):
+        key = self._keys.get(item)
+        if key is None:
+            digest = hashlib.blake2b(repr(item).encode(), digest_size=8, key=self.salt).digest()
+            key = self._keys[item] = int.from_bytes(digest, "little")
+        return key
+
+    def add(self, name, cell):
+        count = self._counts.get((name, cell), 0)
+        self.value ^= self.key(name, cell, count)
+        self._counts[(name, cell)] = count + 1
+
+    def remove(self, name, cell):
+        count = self._counts[(name, cell)] - 1
+        self.value ^= self.key(name, cell, count)
+        if count == 0:
+            del self._counts[(name, cell)]
+        else:
+            self._counts[(name, cell)] = count
+
+    def set_scalar(self, name, value):
+        """Sets the value of a scalar part of the state (None to remove it)."""
+        if name in self._scalars:
+            self.value ^= self.key(name, self._scalars.pop(name))
+        if value is not None:
+            self.value ^= self.key(name, value)
+            self._scalars[name] = value
+
+
+class HashedMultiGrid(TrackedMultiGrid):
+    """TrackedMultiGrid also keeping the Zobrist hash of its occupancy (entity types per cell, cell x + y * width),
+    updated as entities are placed, moved and removed."""
+
+    def __init__(self, width, height, torus):
+        super().__init__(width, height, torus)
+        self.zobrist = ZobristHash()
+
+    def place_agent(self, agent, pos):
+        x, y = pos
+        if agent.pos is None or agent not in self._grid[x][y]:
+            self.zobrist.add(str(type(agent)), x + y * self.width)
+        super().place_agent(agent, pos)
+
+    def remove_agent(self, agent):
+        x, y = agent.pos
+        self.zobrist.remove(str(type(agent)), x + y * self.width)
+        super().remove_agent(agent)
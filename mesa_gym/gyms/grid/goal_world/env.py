@@ -15,20 +15,35 @@ class MesaGoalEnv(gym.Env):
         All actions are just about moving; directions are provided by the MESA grid world
 
         ### Observation Space
-        The observation space consists of a matrix with all positions of entities
+        The observation space consists of a matrix with all positions of entities.
+        With `hashed_obs`, observations are instead a 64-bit hash of the positions, maintained
+        incrementally by the world: a compact key for tabular methods (Q-tables, visit counts).
+
+        ### Episode Truncation
+        With `max_episode_steps`, episodes are truncated after that number of steps,
+        and the info of each agent reports it with a "truncated" key.
 
         ### Arguments
         ```
-        gym.make('MesaGoalEnv-v0', map: string = None)
+        gym.make('MesaGoalEnv-v0', map: string = None, max_episode_steps: int = None, hashed_obs: bool = False)
         ```
     """
 
     metadata = {"render_modes": ["human"], "render_fps": 25}
 
-    def __init__(self, render_mode=None, map=None):
+    # keys that may appear in the info of an agent
+    info_fields = ["success", "truncated"]
+    # attributes of the agents reported in their info (the other keys are events)
+    state_fields = []
+
+    def __init__(self, render_mode=None, map=None, max_episode_steps=None, hashed_obs=False):
 
         assert render_mode is None or render_mode in self.metadata["render_modes"]
         self.render_mode = render_mode
+        self.max_episode_steps = max_episode_steps   # None for episodes without limit
+        self.hashed_obs = hashed_obs                 # observations as 64-bit hashes of the positions
+        self.n_steps = 0
+        self.truncated = False
 
         if self.render_mode == "human":
             self.fps = self.metadata["render_fps"]
@@ -79,7 +94,10 @@ class MesaGoalEnv(gym.Env):
         n_features = size * (MAX - MIN) * len(self.entities)
         features_high = np.array([MAX] * n_features, dtype=np.float32)
         features_low = np.array([MIN] * n_features, dtype=np.float32)
-        self.observation_space = spaces.Box(features_low, features_high)
+        if self.hashed_obs:
+            self.observation_space = spaces.Box(0, np.iinfo(np.uint64).max, shape=(), dtype=np.uint64)
+        else:
+            self.observation_space = spaces.Box(features_low, features_high)
 
     def _get_world(self):
         return w.create_world(self.map)
@@ -88,13 +106,11 @@ class MesaGoalEnv(gym.Env):
         return self.model.entities
 
     def _get_agents(self):
-        agents = []
-        for entity in self.model.entities:
-            if type(entity) is w.Mouse:
-                agents.append(entity)
-        return agents
+        return self.model.entities.of_type(w.Mouse)
 
     def _get_obs(self):
+        if self.hashed_obs:
+            return self.model.get_state_hash()
         return self.model.get_positions()
 
     def _get_info(self):
@@ -105,11 +121,16 @@ class MesaGoalEnv(gym.Env):
             if agent in self.events:
                 for event in self.events[agent]:
                     info[agent.unique_id][event] = self.events[agent][event]
+            if self.truncated:
+                info[agent.unique_id]["truncated"] = 1
         return info
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
 
+        self.n_steps = 0
+        self.truncated = False
+
         if self.booting:
             self.booting = False
         else:
@@ -125,8 +146,8 @@ class MesaGoalEnv(gym.Env):
 
         return observation, info
 
-    def _get_rewards(self, events):
-        rewards = {}
+    def _get_rewards(self, events, rewards=None):
+        rewards = {} if rewards is None else rewards
 
         # for agent in self._get_agents():
         #     rewards[agent.unique_id] = -1               # losing energy for each time step
@@ -152,17 +173,25 @@ class MesaGoalEnv(gym.Env):
         for agent in self._get_agents():
             agent.next_action = self.potential_actions[actions[agent.unique_id]]
 
+        terminated, events = self._step_world()
+
+        rewards = self._get_rewards(events)
+        observation = self._get_obs()
+        info = self._get_info()
+
+        return observation, rewards, terminated, self.truncated, info
+
+    def _step_world(self):
         self.events = {}
         terminated, events = self.model.step()
 
+        self.n_steps += 1
+        self.truncated = not terminated and self.max_episode_steps is not None and self.n_steps >= self.max_episode_steps
+
         if self.render_mode == "human":
             self._render_frame()
 
-        rewards = self._get_rewards(events)
-        observation = self._get_obs()
-        info = self._get_info()
-
-        return observation, rewards, terminated, False, info
+        return terminated, events
 
     def render(self):
         self.view.show()
@@ -7,6 +7,9 @@ from gymnasium import spaces
 import numpy as np
 
 
+VALUE_DIMENSIONS = ["selfishness", "altruism", "environmentalism"]
+
+
 class MesaLumberjackEnv(gym.Env):
     """
         MesaLumberjack involves a grid world populated by lumberjacks that cut trees
@@ -26,22 +29,54 @@ class MesaLumberjackEnv(gym.Env):
             - a vector of 9 items for each neighbour cell with sum of trees' strengths if present, 0 otherwise
             - a vector of 9 items for each neighbour cell with sum of agents' strengths if present, 0 otherwise
 
+        ### Rewards
+        Rewards depend on the value dimension given with `value_dim`:
+        "selfishness", "altruism" or "environmentalism".
+        With a list of value dimensions (or "all"), the reward of each agent is a vector
+        with one item for each dimension, in the given order.
+
+        ### Field of View
+        Agents perceive the cells within `percept_radius` (7x7 cells by default), and with `percept_levels`
+        the 8 surrounding blocks of each coarser level, pooled (see mesa_gym.common.percepts).
+
+        ### Episode Truncation
+        With `max_episode_steps`, episodes are truncated after that number of steps,
+        and the info of each agent reports it with a "truncated" key.
+
         ### Arguments
         ```
-        gym.make('MesaLumberjack-v0', map: string = None)
+        gym.make('MesaLumberjack-v0', map: string = None, value_dim: string | list = None, max_episode_steps: int = None,
+                 percept_radius: int = 3, percept_levels: int = 0)
         ```
     """
 
     metadata = {"render_modes": ["human"], "render_fps": 25}
 
-    def __init__(self, render_mode=None, map=None, value_dim=None):
+    # keys that may appear in the info of an agent
+    info_fields = ["strength", "success", "failure", "truncated"]
+    # attributes of the agents reported in their info (the other keys are events)
+    state_fields = ["strength"]
+
+    def __init__(self, render_mode=None, map=None, value_dim=None, max_episode_steps=None, percept_radius=3, percept_levels=0):
 
         assert render_mode is None or render_mode in self.metadata["render_modes"]
         self.render_mode = render_mode
+        self.max_episode_steps = max_episode_steps   # None for episodes without limit
+        self.percept_radius = percept_radius
+        self.percept_levels = percept_levels
+        self.n_steps = 0
+        self.truncated = False
 
         if self.render_mode == "human":
             self.fps = self.metadata["render_fps"]
 
+        if value_dim == "all":
+            value_dim = VALUE_DIMENSIONS
+        if isinstance(value_dim, (list, tuple)):
+            for dim in value_dim:
+                if dim not in VALUE_DIMENSIONS:
+                    raise RuntimeError(f"Unknown value dimension '{dim}'.")
+            value_dim = list(value_dim)
         self.value_dim = value_dim
 
         self.map = map
@@ -75,6 +110,12 @@ class MesaLumberjackEnv(gym.Env):
             self.observation_space[agent.unique_id] = spaces.Box(features_high, features_low)
 
     def _get_world(self):
+        model = self._create_world()
+        model.percept_radius = self.percept_radius
+        model.percept_levels = self.percept_levels
+        return model
+
+    def _create_world(self):
         if self.map is None:
             width = random.randrange(30, 40)
             height = random.randrange(5, 10)
@@ -101,11 +142,7 @@ class MesaLumberjackEnv(gym.Env):
         return self.model.entities
 
     def _get_agents(self):
-        lumberjacks = []
-        for entity in self.model.entities:
-            if isinstance(entity, mesa_lumberjack.Lumberjack):
-                lumberjacks.append(entity)
-        return lumberjacks
+        return self.model.entities.of_type(mesa_lumberjack.Lumberjack)
 
     def _get_obs(self):
         return {agent.unique_id: agent.get_percepts() for agent in self.agents}
@@ -119,11 +156,16 @@ class MesaLumberjackEnv(gym.Env):
             if agent in self.events:
                 for event in self.events[agent]:
                     info[agent.unique_id][event] = self.events[agent][event]
+            if self.truncated:
+                info[agent.unique_id]["truncated"] = 1
         return info
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
 
+        self.n_steps = 0
+        self.truncated = False
+
         if self.booting:
             self.booting = False
         else:
@@ -140,15 +182,17 @@ class MesaLumberjackEnv(gym.Env):
 
         return observations, infos
 
-    def _get_rewards(self, events):
+    def _get_rewards(self, events, rewards=None):
 
+        rewards = {} if rewards is None else rewards
         if self.value_dim is None:
-            return {}
+            return rewards
+        elif isinstance(self.value_dim, list):
+            return self._get_reward_vectors(events, self.value_dim, rewards)
         else:
             value_dim = self.value_dim
 
         self.events = {}
-        rewards = {}
 
         for agent, tree in events:
 
@@ -171,21 +215,56 @@ class MesaLumberjackEnv(gym.Env):
 
         return rewards
 
+    def _get_reward_vectors(self, events, value_dims, rewards):
+        # all value dimensions are computed together from the number of trees cut by each agent
+        index = {agent: i for i, agent in enumerate(self.agents)}
+        cuts = np.zeros(len(self.agents))
+
+        self.events = {}
+        for agent, tree in events:
+            self.events[agent] = {}
+            if tree is False:
+                self.events[agent]["failure"] = 1
+            else:
+                self.events[agent]["success"] = 1
+                cuts[index[agent]] += 1
+
+        has_cut = cuts > 0
+        others_have_cut = (cuts.sum() - cuts) > 0
+        rewards_per_dim = {
+            "selfishness": has_cut.astype(float),
+            "altruism": others_have_cut.astype(float),
+            "environmentalism": -(has_cut & (self.model.ntrees == 0)).astype(float)
+        }
+        vectors = np.stack([rewards_per_dim[dim] for dim in value_dims], axis=1)
+
+        for i, agent in enumerate(self.agents):
+            rewards[agent.unique_id] = vectors[i]
+        return rewards
+
     def step(self, actions):
 
         for agent in self.agents:
             agent.next_action = self.potential_actions[actions[agent.unique_id]]
 
-        terminated, events = self.model.step()
-
-        if self.render_mode == "human":
-            self._render_frame()
+        terminated, events = self._step_world()
 
         rewards = self._get_rewards(events)
         observations = self._get_obs()
         infos = self._get_info()
 
-        return observations, rewards, terminated, False, infos
+        return observations, rewards, terminated, self.truncated, infos
+
+    def _step_world(self):
+        terminated, events = self.model.step()
+
+        self.n_steps += 1
+        self.truncated = not terminated and self.max_episode_steps is not None and self.n_steps >= self.max_episode_steps
+
+        if self.render_mode == "human":
+            self._render_frame()
+
+        return terminated, events
 
     def render(self):
         self.view.show()
@@ -13,13 +13,12 @@ import os
 path = os.path.dirname(os.path.abspath(__file__))
 
 import numpy as np
-import pickle
+from mesa_gym.trainers.qtable import load_q_table
 
 def load_trained_models(trained_models):
     q_tables = {}
     for agent_type in trained_models.keys():
-        with open(trained_models[agent_type], "rb") as f:
-            q_tables[agent_type] = pickle.load(f)
+        q_tables[agent_type] = load_q_table(trained_models[agent_type])
     return q_tables
 
 # load q_tables from trained models
@@ -6,9 +6,17 @@ path = os.path.dirname(os.path.abspath(__file__))
 
 VALUE_DIMENSION = "selfishness"
 
+# add other value dimensions to train one model for each of them on the same episodes
+# (eg. VALUE_DIMENSIONS = ["selfishness", "altruism", "environmentalism"])
+# actions are selected by the model of the first dimension, the others learn off-policy
+VALUE_DIMENSIONS = [VALUE_DIMENSION]
+
 # load the target environment
 import mesa_gym.gyms.grid.lumberjack.env as w
-env = w.MesaLumberjackEnv(render_mode=None, value_dim=VALUE_DIMENSION)
+# episodes are truncated after this number of steps (None for no limit)
+max_episode_steps = 1000
+
+env = w.MesaLumberjackEnv(render_mode=None, value_dim=VALUE_DIMENSIONS, max_episode_steps=max_episode_steps)
 
 agent_types = []
 agent_type_to_id = {}
@@ -29,6 +37,16 @@ for mesa_agent in env.agents:
 
 n_episodes = 500  # 100_000
 
+# budget of the whole training run, in environment steps and in seconds (None for no limit)
+# when the budget is exhausted, the current episode is truncated and the training stops
+from mesa_gym.trainers.budget import TrainingBudget
+max_training_steps = None
+max_training_seconds = None
+
+# periodic checkpoints of the training run, which is resumed from the last checkpoint when restarted
+from mesa_gym.trainers.checkpoint import Checkpointer
+checkpoint_seconds = 300
+
 # create the trainee agent instances
 
 from tqdm import tqdm
@@ -84,13 +102,25 @@ start_epsilon = 1.0
 epsilon_decay = start_epsilon / (n_episodes / 2)  # reduce the exploration over time
 final_epsilon = 0.1
 
-experiment_name = f"lumberjack-qlearning_{VALUE_DIMENSION}_{n_episodes}_{learning_rate}_{start_epsilon}_{epsilon_decay}_{final_epsilon}"
+experiment_names = {}
+for value_dim in VALUE_DIMENSIONS:
+    experiment_names[value_dim] = f"lumberjack-qlearning_{value_dim}_{n_episodes}_{learning_rate}_{start_epsilon}_{epsilon_decay}_{final_epsilon}"
+experiment_name = experiment_names[VALUE_DIMENSIONS[0]]
 
 trainees = {}
 for agent_type in agent_types:
-    trainees[agent_type] = QLearningTrainer(agent=agent_type, action_space=env.action_space[agent_type_to_id[agent_type]], learning_rate=learning_rate, initial_epsilon=start_epsilon, epsilon_decay=epsilon_decay, final_epsilon=final_epsilon)
-
-for episode in tqdm(range(n_episodes)):
+    trainees[agent_type] = {}
+    for value_dim in VALUE_DIMENSIONS:
+        trainees[agent_type][value_dim] = QLearningTrainer(agent=agent_type, action_space=env.action_space[agent_type_to_id[agent_type]], learning_rate=learning_rate, initial_epsilon=start_epsilon, epsilon_decay=epsilon_decay, final_epsilon=final_epsilon)
+
+# trainers flattened by agent type and value dimension for the checkpoints
+checkpointed = {(agent_type, value_dim): trainees[agent_type][value_dim] for agent_type in trainees for value_dim in VALUE_DIMENSIONS}
+checkpointer = Checkpointer(f"{path}/checkpoints/{experiment_name}", every_seconds=checkpoint_seconds)
+first_episode = checkpointer.resume(checkpointed, data)
+budget = TrainingBudget(max_steps=max_training_steps, max_seconds=max_training_seconds)
+for episode in tqdm(range(first_episode, n_episodes)):
+    if budget.exhausted():
+        break
     observations, info = env.reset()
     done = False
 
@@ -108,16 +138,21 @@ for episode in tqdm(range(n_episodes)):
         actions = {}
         for agent_type in agent_types:
             id = agent_type_to_id[agent_type]
-            actions[id] = trainees[agent_type].select_action(observations[id])
+            actions[id] = trainees[agent_type][VALUE_DIMENSIONS[0]].select_action(observations[id])
 
         next_observations, rewards, terminated, truncated, info = env.step(actions)
+        truncated = budget.step() or truncated
 
         # collect data
         data[episode][step] = {}
         for agent_type in agent_types:
             id = agent_type_to_id[agent_type]
             data[episode][step][agent_type] = {}
-            data[episode][step][agent_type]["reward"] = rewards[id] if id in rewards else 0
+            data[episode][step][agent_type]["reward"] = rewards[id][0] if id in rewards else 0
+            for d, value_dim in enumerate(VALUE_DIMENSIONS[1:], start=1):
+                if f"reward_{value_dim}" not in data["fields"]:
+                    data["fields"].append(f"reward_{value_dim}")
+                data[episode][step][agent_type][f"reward_{value_dim}"] = rewards[id][d] if id in rewards else 0
             if id in info:
                 for key in info[id]:
                     if key not in data["fields"]:
@@ -127,8 +162,9 @@ for episode in tqdm(range(n_episodes)):
         # update the agent
         for agent_type in agent_types:
             id = agent_type_to_id[agent_type]
-            reward = rewards[id] if id in rewards else 0
-            trainees[agent_type].update(observations[id], actions[id], reward, terminated, next_observations[id])
+            for d, value_dim in enumerate(VALUE_DIMENSIONS):
+                reward = rewards[id][d] if id in rewards else 0
+                trainees[agent_type][value_dim].update(observations[id], actions[id], reward, terminated, next_observations[id])
         observations = next_observations
 
         # update if the environment is done and the current obs
@@ -136,14 +172,21 @@ for episode in tqdm(range(n_episodes)):
         step += 1
 
     for agent_type in agent_types:
-        trainees[agent_type].decay_epsilon()
+        for value_dim in VALUE_DIMENSIONS:
+            trainees[agent_type][value_dim].decay_epsilon()
+
+    checkpointer.step(episode, checkpointed, data)
 
 import pickle
+from mesa_gym.trainers.qtable import save_q_table
 for trainee in trainees:
-    filename = f"models/{trainee}_{experiment_name}.pickle"
-    with open(f"{path}/{filename}", "wb") as f:
-        pickle.dump(trainees[trainee].q_table(), f)
-        print(f"trained model saved in {filename}")
+    for value_dim in VALUE_DIMENSIONS:
+        filename = f"models/{trainee}_{experiment_names[value_dim]}.pickle"
+        with open(f"{path}/{filename}", "wb") as f:
+            pickle.dump(trainees[trainee][value_dim].q_table(), f)
+            print(f"trained model saved in {filename}")
+        # memory-mapped copy, for fast loading at inference (see load_q_table)
+        save_q_table(trainees[trainee][value_dim].q_table(), f"{path}/{filename[:-len('.pickle')]}.qtable")
 
 import pickle
 filename = f"data/{experiment_name}.pickle"
@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
 import random
 
-import mesa
 from enum import Enum
 
+from mesa_gym.common.entity import Entity
+from mesa_gym.common.gridworld import GridAgentBody, GridWorldModel, WorldView, create_world
+from mesa_gym.common.percepts import Channel
+
 #######################
 # physical entities
 #######################
 
-class Tree(mesa.Agent):
+class Tree(Entity):
+
+    __slots__ = ("strength",)
 
     def __init__(self, unique_id, model, strength=1):
         super().__init__(unique_id, model)
@@ -17,64 +22,33 @@ class Tree(mesa.Agent):
     def get_state(self):
         return (self.strength)
 
-    def destroy(self):
-        self.model.remove_entity(self)
-
-    def step(self):
-        pass
-
     def show(self):
         return str(self.strength)
 
 class Strength1Tree(Tree):
+    __slots__ = ()
+
     def __init__(self, unique_id, model):
         super().__init__(unique_id, model, strength=1)
 
 class Strength2Tree(Tree):
+    __slots__ = ()
+
     def __init__(self, unique_id, model):
         super().__init__(unique_id, model, strength=2)
 
-class Lumberjack(mesa.Agent):
+class Lumberjack(GridAgentBody):
 
     def __init__(self, unique_id, model, strength):
         super().__init__(unique_id, model)
         self.strength = strength
-        self.mental_init()
 
     def get_state(self):
         return (self.strength, self.pos)
 
-    @staticmethod
-    def get_directions():
-        directions = []
-        for i in range(-1, 2):
-            for j in range (-1, 2):
-                directions.append((i, j))
-        return directions
-
-    def get_percepts(self, radius=3):
-        # cells = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=True)
-
-        # diameter = radius * 2 + 1
-        # array_size = diameter ** 2
-        percepts_about_trees = []
-        percepts_about_agents = []
-
-        for dx in range(-radius, radius+1):
-            for dy in range(-radius, radius+1):
-                absx, absy = self.pos
-                x = (absx + dx) % self.model.width
-                y = (absy + dy) % self.model.height
-                tree_total_strength = 0
-                agent_total_strength = 0
-                for item in self.model.grid.get_cell_list_contents((x, y)):
-                    if isinstance(item, Tree):
-                        tree_total_strength += item.strength
-                    elif isinstance(item, Lumberjack):
-                        agent_total_strength += item.strength
-                percepts_about_trees.append(tree_total_strength)
-                percepts_about_agents.append(agent_total_strength)
-        return percepts_about_agents + percepts_about_trees
+    def _get_channels(self):
+        # strength of the agents, then strength of the trees, in each cell of the field of view
+        return [Channel(Lumberjack, weight="strength"), Channel(Tree, weight="strength")]
 
     def react(self):
         elems = self.model.grid.get_cell_list_contents([self.pos])
@@ -90,36 +64,10 @@ class Lumberjack(mesa.Agent):
                             self.model.events.append((self, False))
                             self.trace("I've found a tree... but that's too big for me!")
 
-    def move(self, direction):
-        dx, dy = direction
-        absx, absy = self.pos
-        x = absx + dx; y = absy + dy
-        self.model.grid.move_agent(self, (x, y))
-
-    def step(self):
-        self.mental_step()
-        self.react()
-
-    def mental_init(self):
-        self.next_action = None
-
     def mental_step(self):
         percepts = self.get_percepts()
         self.trace(f"percepts: {percepts}")
-        if self.next_action is None:
-            self.next_action = self.random.choice(self.get_directions())
-        self.trace(f"next action: {self.next_action}")
-        self.move(self.next_action)
-        self.next_action = None
-
-    def destroy(self):
-        self.model.remove_entity(self)
-
-    def trace(self, text):
-        self.model.console.append(f"{type(self).__name__} {self.unique_id} > {text}".ljust(90, " "))
-
-    def show(self):
-        raise RuntimeError("Not defined symbol.")
+        super().mental_step()
 
 
 #######################
@@ -147,45 +95,27 @@ class WeakLumberjack(Lumberjack):
 # world
 #######################
 
-class WorldModel(mesa.Model):
+class WorldModel(GridWorldModel):
 
-    def __init__(self, width, height):
-        self.entities = []
-        self.disabilities = {}
-        self.width = width
-        self.height = height
-        self.schedule = mesa.time.RandomActivation(self)
-        self.grid = mesa.space.MultiGrid(width, height, True)
-        self.end = False
-        self.console = []
+    percept_radius = 3
 
+    def __init__(self, width, height):
+        super().__init__(width, height)
         self.ntrees = 0
 
-    def step(self):
-        self.events = []
-        self.schedule.step()
-        return self.end, self.events
+    def create_entity(self, entity_type, x, y):
+        return entity_type(self.entities.next_id(), self)
 
     def add_entity(self, entity_type, x, y):
-        entity = entity_type(len(self.entities), self)
-        self.grid.place_agent(entity, (x, y))
-        self.schedule.add(entity)
-        self.entities.append(entity)
+        entity = super().add_entity(entity_type, x, y)
 
         # MOD for lumberjack
         if isinstance(entity, Tree):
             self.ntrees += 1
-
-    def add_disability(self, entity_type, action, callable_for_value):
-        if entity_type not in self.disabilities:
-            self.disabilities[entity_type] = {}
-        if action not in self.disabilities[entity_type]:
-            self.disabilities[entity_type][action] = []
-        self.disabilities[entity_type][action].append(callable_for_value)
+        return entity
 
     def remove_entity(self, entity):
-        self.grid.remove_agent(entity)
-        self.schedule.remove(entity)
+        super().remove_entity(entity)
 
         # MOD for lumberjack
         if isinstance(entity, Tree):
@@ -194,86 +124,6 @@ class WorldModel(mesa.Model):
                 self.trace("All trees have been cut! End of game.")
                 self.end = True
 
-    def remove_disability(self, entity_type, action, callable_for_value):
-        self.disabilities[entity_type][action].remove(callable_for_value)
-
-    def trace(self, text):
-        self.console.append(f">>>>>>> {text}".ljust(90, " "))
-
-
-#######################
-# viewer
-#######################
-
-import time
-
-
-def move(x, y):
-    print("\033[%d;%dH" % (y, x))
-
-
-class WorldView:
-    def __init__(self, world_model, fps=25):
-        self.world = world_model
-
-        # from frame per second (fps) toseconds per frame (ms)
-        # eg. 25 f/s = 1/25 s/f = 1000/25 ms/f = 40 ms/f
-        self.delay = 1/fps
-
-    def init(self):
-        print('\x1b[2J')
-
-    def header(self):
-        move(0, 0)
-        print("mesagym -- minimal gym built on top on mesa\n")
-
-    def show(self, reverse_order=False):
-        self.header()
-        string = ""
-
-        string += "|"
-        for i in range(0, self.world.height):
-            string += "-"
-        string += "|\n"
-
-        # for how mesa furnish the coordinate
-        # we have to print the transpose of the world
-        for cell in self.world.grid.coord_iter():
-            cell_content, (x, y) = cell
-            if y == 0:
-                string += "|"
-            if len(cell_content) > 0:
-                found = False
-                for entity in cell_content:
-                    if isinstance(entity, Lumberjack):
-                        string += entity.show()
-                        found = True
-                        break
-                if not found:
-                    string += cell_content[0].show()
-            else:
-                string += " "
-            if y == self.world.height - 1:
-                string += "|\n"
-
-        string += "|"
-        for i in range(0, self.world.height):
-            string += "-"
-        string += "|\n"
-
-        print(string)
-
-        print(">>> console <<<")
-
-        if reverse_order:
-            console = reversed(self.world.console[-5:])
-        else:
-            console = self.world.console[-5:]
-        for item in console:
-            print(item)
-
-        time.sleep(self.delay)
-
 
 #######################
 # helpers
@@ -311,36 +161,7 @@ class Symbol(Enum):
 
 
 def load_world(map):
-    # remove trailing new line at the beginning
-    if map[0] == "\n": map = map[1:]
-
-    width = map.index("\n") - 2  # accounting for the borders
-    if width == 0:
-        raise ValueError("Unexpected dimensions of the map.")
-
-    height = int(len(map) / (width + 3)) - 2  # accounting for the borders and newlines
-    if height == 0 or len(map) % (width + 3) != 0:
-        raise ValueError("Unexpected dimensions of the map.")
-
-    # print(f"loading a {width}x{height} grid map...")
-    model = WorldModel(height, width)
-
-    x = 0
-    y = 0
-    for z, ch in enumerate(map):
-        if width + 3 < z < len(map) - width - 3:
-            if 0 < z % (width + 3) <= width:
-                if ch == " ":
-                    pass
-                else:
-                    entity_type = Symbol.symbol_to_entity(ch)
-                    model.add_entity(entity_type, x, y)
-                y += 1
-            if z % (width + 3) == 0:
-                x += 1
-                y = 0
-
-    return model
+    return create_world(map, Symbol, WorldModel)
 
 # create a random map
 def create_random_world(height, width, entities_dict):
@@ -357,20 +178,12 @@ def create_random_world(height, width, entities_dict):
     if len(entities) > map_size:
         raise RuntimeError("Not valid value: the map size should be bigger than the number of entities to be created.")
 
-    x = 0; y = 0
-    while y < height and x < width:
-        generated_map_size = x + y*width
-        if len(entities) == 0:
-            break
-        prob = len(entities)/(map_size - generated_map_size)
-        if random.random() <= prob:
-            selected = random.randint(0, len(entities) - 1)
-            model.add_entity(entities[selected], x, y)
-            del(entities[selected])
-        x += 1
-        if x >= width:
-            x = 0
-            y += 1
+    # the occupied cells are drawn at once without replacement, and the entities are
+    # assigned to them by a random permutation: each placement is equally likely
+    cells = sorted(random.sample(range(map_size), len(entities)))
+    random.shuffle(entities)
+    for cell, entity_type in zip(cells, entities):
+        model.add_entity(entity_type, cell % width, cell // width)
 
     return model
 
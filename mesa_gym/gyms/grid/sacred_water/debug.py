@@ -1,5 +1,5 @@
 import numpy as np
-import pickle
+from mesa_gym.trainers.qtable import load_q_table
 
 import os
 path = os.path.dirname(os.path.abspath(__file__))
@@ -34,8 +34,7 @@ dqn_trained_models = {}
 # load q_tables
 q_tables = {}
 for id in q_trained_models.keys():
-    with open(q_trained_models[id], "rb") as f:
-        q_tables[id] = pickle.load(f)
+    q_tables[id] = load_q_table(q_trained_models[id])
 
 # load dqn_models
 dqn_models = {}
@@ -43,15 +42,14 @@ for id in dqn_trained_models.keys():
 
     import gymnasium as gym
     import torch
-    from mesa_gym.trainers.DQN import DQN
+    from mesa_gym.trainers.DQN import load_dqn
 
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
     nb_actions = gym.spaces.flatdim(env.action_space)
     nb_states = gym.spaces.flatdim(env.observation_space)
 
-    dqn_models[id] = DQN(nb_states, nb_actions)
-    dqn_models[id].load_state_dict(torch.load(dqn_trained_models[id]))
+    dqn_models[id] = load_dqn(torch.load(dqn_trained_models[id]), nb_states, nb_actions)
     dqn_models[id].eval()
 
 ########################################
@@ -96,8 +94,10 @@ for _ in range(100):
             best_action_value = np.max(q_tables[id][tuple(obs)])
         elif id in dqn_models:
             state = torch.tensor(obs, dtype=torch.float32, device=device).unsqueeze(0)
-            best_action = int(dqn_models[id](state).max(1)[1].view(1, 1))
-            best_action_value = dqn_models[id](state).tolist()[0][best_action]
+            with torch.no_grad():
+                q_values = dqn_models[id](state)
+            best_action = int(q_values.argmax(1))
+            best_action_value = float(q_values[0, best_action])
         else:
             raise RuntimeError(f"No model available for agent id {id}")
 
@@ -155,18 +155,7 @@ print("")
 
 obs, info = env.reset()
 
-size = env.model.width * env.model.height
-
-# here we reverse engineer obs, by cutting the views of the different agents.
-# then we identify the view of a specific agent by using its initial position
-views = []
-view = []
-for i, c in enumerate(obs):
-    view.append(c)
-    j = int((i+1)/size)
-    if j > 0 and (i+1) % size == 0:
-        views.append(view)
-        view = []
+from mesa_gym.common.policy_map import policy_map
 
 charts_best_actions = {}
 charts_pos_values = {}
@@ -174,56 +163,33 @@ charts_pos_values = {}
 for agent in env._get_agents():
     id = agent.unique_id
 
-    x, y = agent.pos
-    pos = x + y * env.model.width
-
-    agent_scope = None
-    for i, view in enumerate(views):
-        if view[pos] == 1:
-            agent_scope = i
-    if agent_scope is None:
-        raise RuntimeError("Wrong reverse engineering of obs")
-
-    # create empty charts for each agent
-    if id not in charts_best_actions:
-        charts_best_actions[id] = {}
-        charts_pos_values[id] = {}
-
-        for i in range(env.model.width):
-            charts_best_actions[id][i] = {}
-            charts_pos_values[id][i] = {}
+    if id in q_tables:
+        model = q_tables[id]
+    elif id in dqn_models:
+        model = dqn_models[id]
+    else:
+        raise RuntimeError(f"Unknown agent with id {id}")
 
-            for j in range(env.model.height):
-               charts_best_actions[id][i][j] = empty_symbol
-               charts_pos_values[id][i][j] = None
-
-    mod_pos = x + y * env.model.width + size * agent_scope
+    # best actions and values for all the starting positions at once
+    best_actions, best_values = policy_map(model, obs, env.model.width, env.model.height, agent.pos)
+    # from mesa_gym.common.policy_map import export_heatmaps
+    # export_heatmaps(best_actions, best_values, env.potential_actions, f"{path}/policy_map_{id}.png")
 
+    charts_best_actions[id] = {}
+    charts_pos_values[id] = {}
     for x in range(env.model.width):
+        charts_best_actions[id][x] = {}
+        charts_pos_values[id][x] = {}
         for y in range(env.model.height):
-            obs[mod_pos] = 0
-            mod_pos = x + y * env.model.width + size * agent_scope
-            obs[mod_pos] = 1
-
-            if id in q_tables:
-                if tuple(obs) in q_tables[id]:
-                    best_action = int(np.argmax(q_tables[id][tuple(obs)]))
-                    best_action_value = np.max(q_tables[id][tuple(obs)])
-#                else:
-#                    raise RuntimeError("Warning: state not present in the Q-table, have you loaded the correct one?")
-            elif id in dqn_models:
-                state = torch.tensor(obs, dtype=torch.float32, device=device).unsqueeze(0)
-                best_action = int(dqn_models[id](state).max(1)[1].view(1, 1))
-                best_action_value = dqn_models[id](state).tolist()[0][best_action]
-            else:
-                raise RuntimeError("Unknown agent with id {id}")
-
-            if best_action_value >= 0.01:
-                charts_best_actions[id][x][y] = action2symbol[best_action]
-                charts_pos_values[id][x][y] = best_action_value
+            if best_actions[x, y] < 0:      # state not present in the Q-table
+                charts_best_actions[id][x][y] = empty_symbol
+                charts_pos_values[id][x][y] = None
+            elif best_values[x, y] >= 0.01:
+                charts_best_actions[id][x][y] = action2symbol[int(best_actions[x, y])]
+                charts_pos_values[id][x][y] = best_values[x, y]
             else:
                 charts_best_actions[id][x][y] = "."
-                charts_pos_values[id][x][y] = best_action_value
+                charts_pos_values[id][x][y] = best_values[x, y]
 
 for id in charts_best_actions:
     print(f"==== Agent with id {id}")
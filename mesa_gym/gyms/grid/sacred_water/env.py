@@ -10,10 +10,19 @@ class MesaSacredWaterEnv(gym.Env):
 
     metadata = {"render_modes": ["human"], "render_fps": 25}
 
-    def __init__(self, render_mode=None, map=None):
+    # keys that may appear in the info of an agent
+    info_fields = ["moving", "starved", "shrivelled", "eating", "drinking", "truncated"]
+    # attributes of the agents reported in their info (the other keys are events)
+    state_fields = []
+
+    def __init__(self, render_mode=None, map=None, max_episode_steps=None, hashed_obs=False):
 
         assert render_mode is None or render_mode in self.metadata["render_modes"]
         self.render_mode = render_mode
+        self.max_episode_steps = max_episode_steps   # None for episodes without limit
+        self.hashed_obs = hashed_obs                 # observations as 64-bit hashes of the positions
+        self.n_steps = 0
+        self.truncated = False
 
         if self.render_mode == "human":
             self.fps = self.metadata["render_fps"]
@@ -48,22 +57,23 @@ class MesaSacredWaterEnv(gym.Env):
         n_features = size * (MAX - MIN) * len(self.entities)
         features_high = np.array([MAX] * n_features, dtype=np.float32)
         features_low = np.array([MIN] * n_features, dtype=np.float32)
-        self.observation_space = spaces.Box(features_low, features_high)
+        if self.hashed_obs:
+            self.observation_space = spaces.Box(0, np.iinfo(np.uint64).max, shape=(), dtype=np.uint64)
+        else:
+            self.observation_space = spaces.Box(features_low, features_high)
 
     def _get_world(self):
-        return w.create_world(self.map, w.Symbol)
+        return w.create_world(self.map, w.Symbol, w.SacredWaterModel)
 
     def _get_entities(self):
         return self.model.entities
 
     def _get_agents(self):
-        agents = []
-        for entity in self.model.entities:
-            if type(entity) is w.Gatherer:
-                agents.append(entity)
-        return agents
+        return self.model.entities.of_type(w.Gatherer)
 
     def _get_obs(self):
+        if self.hashed_obs:
+            return self.model.get_state_hash()
         return self.model.get_positions()
 
     def _get_info(self):
@@ -74,11 +84,16 @@ class MesaSacredWaterEnv(gym.Env):
             if agent in self.events:
                 for event in self.events[agent]:
                     info[agent.unique_id][event] = self.events[agent][event]
+            if self.truncated:
+                info[agent.unique_id]["truncated"] = 1
         return info
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
 
+        self.n_steps = 0
+        self.truncated = False
+
         if self.booting:
             self.booting = False
         else:
@@ -94,8 +109,8 @@ class MesaSacredWaterEnv(gym.Env):
 
         return observation, info
 
-    def _get_rewards(self, events):
-        rewards = {}
+    def _get_rewards(self, events, rewards=None):
+        rewards = {} if rewards is None else rewards
 
         for agent, event_type in events:
             self.events[agent] = {}
@@ -127,24 +142,32 @@ class MesaSacredWaterEnv(gym.Env):
 
     def step(self, actions):
 
-        self.events = {}
-
         for agent in self._get_agents():
             agent.next_action = self.potential_actions[actions[agent.unique_id]]
 
+        terminated, events = self._step_world()
+
+        rewards = self._get_rewards(events)
+        observation = self._get_obs()
+        info = self._get_info()
+
+        return observation, rewards, terminated, self.truncated, info
+
+    def _step_world(self):
+        self.events = {}
+
         # there are two components of event in one step:
         # 1. the action performed by the agents
         # 2. the outcomes consequent to the actions
         terminated, events = self.model.step()
 
+        self.n_steps += 1
+        self.truncated = not terminated and self.max_episode_steps is not None and self.n_steps >= self.max_episode_steps
+
         if self.render_mode == "human":
             self._render_frame()
 
-        rewards = self._get_rewards(events)
-        observation = self._get_obs()
-        info = self._get_info()
-
-        return observation, rewards, terminated, False, info
+        return terminated, events
 
     def render(self):
         self.view.show()
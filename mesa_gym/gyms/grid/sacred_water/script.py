@@ -1,7 +1,7 @@
 # script to run models runned by gymnasium
 
 import numpy as np
-import pickle
+from mesa_gym.trainers.qtable import load_q_table
 
 import os
 path = os.path.dirname(os.path.abspath(__file__))
@@ -19,8 +19,7 @@ q_trained_models[2] = "models/Gatherer_2_goal_world-qlearning_1000_0.05_0.95_1.0
 # load q_tables
 q_tables = {}
 for id in q_trained_models.keys():
-    with open(q_trained_models[id], "rb") as f:
-        q_tables[id] = pickle.load(f)
+    q_tables[id] = load_q_table(q_trained_models[id])
 
 # load dqn_models
 dqn_models = {}
@@ -28,15 +27,14 @@ for id in dqn_trained_models.keys():
 
     import gymnasium as gym
     import torch
-    from mesa_gym.trainers.DQN import DQN
+    from mesa_gym.trainers.DQN import load_dqn
 
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
     nb_actions = gym.spaces.flatdim(env.action_space)
     nb_states = gym.spaces.flatdim(env.observation_space)
 
-    dqn_models[id] = DQN(nb_states, nb_actions)
-    dqn_models[id].load_state_dict(torch.load(dqn_trained_models[id]))
+    dqn_models[id] = load_dqn(torch.load(dqn_trained_models[id]), nb_states, nb_actions)
     dqn_models[id].eval()
 
 # playing loop
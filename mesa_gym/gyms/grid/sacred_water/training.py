@@ -5,7 +5,10 @@ path = os.path.dirname(os.path.abspath(__file__))
 # load the target environment
 import mesa_gym.gyms.grid.sacred_water.env as e
 
-env = e.MesaSacredWaterEnv(render_mode=None)
+# episodes are truncated after this number of steps (None for no limit)
+max_episode_steps = 1000
+
+env = e.MesaSacredWaterEnv(render_mode=None, max_episode_steps=max_episode_steps)
 
 agents = []
 type_agent = {}
@@ -16,6 +19,16 @@ for mesa_agent in env._get_agents():
 # target of training
 n_episodes = 10000 # 10_000  # 100_000
 
+# budget of the whole training run, in environment steps and in seconds (None for no limit)
+# when the budget is exhausted, the current episode is truncated and the training stops
+from mesa_gym.trainers.budget import TrainingBudget
+max_training_steps = None
+max_training_seconds = None
+
+# periodic checkpoints of the training run, which is resumed from the last checkpoint when restarted
+from mesa_gym.trainers.checkpoint import Checkpointer
+checkpoint_seconds = 300
+
 # create the trainer instances
 
 from tqdm import tqdm
@@ -36,6 +49,7 @@ def dqn_learning():
     epsilon_decay = start_epsilon / (n_episodes / 2)
     final_epsilon = 0.1    # 0.05
     update_rate = 0.005
+    encoder = "mlp"        # "conv" to learn from the occupancy planes, with a cost bounded whatever the size of the map
 
     experiment_name = f"goal_world-DQNlearning_{n_episodes}_{replay_batch_size}_{update_rate}_{learning_rate}_{discount_factor}_{start_epsilon}_{epsilon_decay}_{final_epsilon}"
 
@@ -50,10 +64,17 @@ def dqn_learning():
                                      final_epsilon=final_epsilon,
                                      epsilon_decay=epsilon_decay,
                                      update_rate=update_rate,
-                                     learning_rate=learning_rate
+                                     learning_rate=learning_rate,
+                                     encoder=encoder,
+                                     grid_shape=(env.model.height, env.model.width)
                                      )
 
-    for _ in tqdm(range(n_episodes)):
+    checkpointer = Checkpointer(f"{path}/checkpoints/{experiment_name}", every_seconds=checkpoint_seconds)
+    first_episode = checkpointer.resume(trainers, data)
+    budget = TrainingBudget(max_steps=max_training_steps, max_seconds=max_training_seconds)
+    for episode in tqdm(range(first_episode, n_episodes)):
+        if budget.exhausted():
+            break
         observation, info = env.reset()
         state = torch.tensor(observation, dtype=torch.float32, device=device).unsqueeze(0)
 
@@ -65,6 +86,7 @@ def dqn_learning():
                 actions[agent] = trainers[agent].select_action(state)
 
             observation, rewards, terminated, truncated, _ = env.step(actions)
+            truncated = budget.step() or truncated
 
             for agent in agents:
                 reward = rewards[agent] if agent in rewards else 0
@@ -89,16 +111,13 @@ def dqn_learning():
 
                 # Soft update of the target network's weights
                 # θ′ ← τ θ + (1 −τ )θ′
-                trainers[agent].target_net_state_dict = trainers[agent].target_net.state_dict()
-                policy_net_state_dict = trainers[agent].policy_net.state_dict()
-                for key in policy_net_state_dict:
-                    trainers[agent].target_net_state_dict[key] = policy_net_state_dict[key] * update_rate + \
-                                                       trainers[agent].target_net_state_dict[key] * (1 - update_rate)
-                trainers[agent].target_net.load_state_dict(trainers[agent].target_net_state_dict)
+                trainers[agent].soft_update()
 
             if done:
                 break
 
+        checkpointer.step(episode, trainers, data)
+
     # save models
 
     for agent in agents:
@@ -110,6 +129,49 @@ def dqn_learning():
     return experiment_name, trainers
 
 
+def dqn_actor_learner(n_actors=2):
+    """DQN with the episodes played by `n_actors` processes, and a central learner (see mesa_gym.trainers.actor_learner)."""
+    from mesa_gym.trainers.actor_learner import train_actor_learner
+    from mesa_gym.trainers.sweep import agent_keys
+    import torch
+
+    replay_batch_size = 32
+    learning_rate = 0.001
+    discount_factor = 0.95
+    start_epsilon = 1.0
+    epsilon_decay = start_epsilon / (n_episodes / 2)
+    final_epsilon = 0.1
+    update_rate = 0.005
+    encoder = "mlp"
+
+    experiment_name = f"sacred_water-DQNactorlearner_{n_actors}_{n_episodes}_{replay_batch_size}_{update_rate}_{learning_rate}_{discount_factor}_{start_epsilon}_{epsilon_decay}_{final_epsilon}"
+
+    trainer_kwargs = {
+        "replay_batch_size": replay_batch_size,
+        "discount_factor": discount_factor,
+        "initial_epsilon": start_epsilon,
+        "final_epsilon": final_epsilon,
+        "epsilon_decay": epsilon_decay,
+        "update_rate": update_rate,
+        "learning_rate": learning_rate,
+        "encoder": encoder,
+        "grid_shape": (env.model.height, env.model.width),
+    }
+    trainers, episode_rewards, episode_lengths = train_actor_learner("sacred_water", trainer_kwargs, n_episodes, n_actors=n_actors,
+                                                                     env_kwargs={"max_episode_steps": max_episode_steps})
+    data["episode_rewards"] = episode_rewards
+    data["episode_lengths"] = episode_lengths
+
+    # save models, named as with dqn_learning
+
+    for agent, key in agent_keys(env).items():
+        filename = f"models/{type_agent[agent]}_{agent}_{experiment_name}.pt"
+        torch.save(trainers[key].policy_net.state_dict(), filename)
+        print(f"trained model saved in {filename}")
+
+    return experiment_name, trainers
+
+
 ######################################
 # q-learning
 ######################################
@@ -132,7 +194,12 @@ def q_learning():
                                            discount_factor=discount_factor, epsilon_decay=epsilon_decay,
                                            final_epsilon=final_epsilon)
 
-    for episode in tqdm(range(n_episodes)):
+    checkpointer = Checkpointer(f"{path}/checkpoints/{experiment_name}", every_seconds=checkpoint_seconds)
+    first_episode = checkpointer.resume(trainers, data)
+    budget = TrainingBudget(max_steps=max_training_steps, max_seconds=max_training_seconds)
+    for episode in tqdm(range(first_episode, n_episodes)):
+        if budget.exhausted():
+            break
         obs, info = env.reset()
         done = False
 
@@ -144,6 +211,7 @@ def q_learning():
             for agent in agents:
                 actions[agent] = trainers[agent].select_action(obs)
             next_obs, rewards, terminated, truncated, info = env.step(actions)
+            truncated = budget.step() or truncated
 
             # collect data
             data[episode][step] = {}
@@ -169,19 +237,25 @@ def q_learning():
         for agent in agents:
             trainers[agent].decay_epsilon()
 
+        checkpointer.step(episode, trainers, data)
+
     # save the Q-table
     import pickle
+    from mesa_gym.trainers.qtable import save_q_table
 
     for trainer in trainers:
         filename = f"models/{type_agent[trainer]}_{trainer}_{experiment_name}.pickle"
         with open(f"{path}/{filename}", "wb") as f:
             pickle.dump(trainers[trainer].q_table(), f)
             print(f"trained model saved in {filename}")
+        # memory-mapped copy, for fast loading at inference (see load_q_table)
+        save_q_table(trainers[trainer].q_table(), f"{path}/{filename[:-len('.pickle')]}.qtable")
 
     return experiment_name, trainers
 
 experiment_name, trainers = q_learning()
 # experiment_name, trainers = dqn_learning()
+# experiment_name, trainers = dqn_actor_learner()
 
 # save data
 
@@ -1,13 +1,20 @@
 # -*- coding: utf-8 -*-
-import random
+from enum import Enum
+from functools import partial
 
-from common import *
+import numpy as np
+
+from mesa_gym.common.entity import Entity
+from mesa_gym.common.fields import decay
+from mesa_gym.common.gridworld import GridAgentBody, GridWorldModel, WorldView, create_world
+from mesa_gym.common.registry import EntityRegistry
+from mesa_gym.common.zobrist import HashedMultiGrid
 
 #######################
 # symbols for map
 #######################
 
-class Symbol(GenericSymbol):
+class Symbol(Enum):
     GATHERER = 1
     FRUIT = 2
     CLEAN_WATER = 3
@@ -22,9 +29,9 @@ class Symbol(GenericSymbol):
         elif symbol == str(Symbol.CLEAN_WATER):
             return Water
         elif symbol == str(Symbol.POISONED_WATER):
-            return Water(poison=10)
+            return partial(Water, poison=10)
         elif symbol == str(Symbol.VERY_POISONED_WATER):
-            return Water(poison=20)
+            return partial(Water, poison=20)
         else:
             raise RuntimeError("Unknown symbol '%s'." % (symbol))
 
@@ -42,6 +49,9 @@ class Symbol(GenericSymbol):
         else:
             raise RuntimeError("Unknown symbol '%s'." % self)
 
+    def __repr__(self):
+        return str(self)
+
 
 
 
@@ -49,66 +59,36 @@ class Symbol(GenericSymbol):
 # physical entities
 #######################
 
-class Fruit(mesa.Agent):
+class Fruit(Entity):
+
+    __slots__ = ()  # the growth of all fruits is computed at once by the world, see SacredWaterModel
 
     def __init__(self, unique_id, model, position):
         super().__init__(unique_id, model)
 
-    def step(self):
-        fruits = 1
-        water = 0
-        poison = 0
-        empty_cells = []
-        for dx in range(-1, 2):
-            for dy in range(-1, 2):
-                if dx != 0 or dy != 0:
-                    if self.pos is not None:
-                        absx, absy = self.pos
-                        x = (absx + dx) % self.model.width
-                        y = (absy + dy) % self.model.height
-
-                        items = self.model.grid.get_cell_list_contents((x, y))
-                        if len(items) == 0:
-                            empty_cells.append((x, y))
-                        for item in items:
-                            if type(item) == Fruit:
-                                fruits += 1
-                            elif type(item) == Water:
-                                water +=  1
-                                poison += item.poison
-                    # else:
-                    # TOCHECK: THIS IS A BUG OCCURRING NOW
-
-
-        # almost arbitrary formula to govern the probability of new fruits to be generated
-        poison = round(poison/5)
-        prob_new_fruit = (max(water - poison, 0)) * (fruits ** 2) / (250 * (4 ** 2))
-
-        # print(f"Probability of growth: {prob_new_fruit}")
-        for cell in empty_cells:
-            if random.random() <= prob_new_fruit:
-                self.model.add_entity(Fruit, cell[0], cell[1])
-
     def show(self):
         return str(Symbol.FRUIT)
 
-    def destroy(self):
-        self.model.remove_entity(self)
 
+class Water(Entity):
 
-class Water(mesa.Agent):
+    __slots__ = ()  # the poison is updated by the world, see the "poison" field
 
     def __init__(self, unique_id, model, position, poison=0):
         super().__init__(unique_id, model)
-        self.poison = poison
+        self.model.fields["poison"].place(position, poison)
+
+    @property
+    def poison(self):
+        return self.model.fields["poison"].get(self.pos)
+
+    @poison.setter
+    def poison(self, value):
+        self.model.fields["poison"].set(self.pos, value)
 
     def get_state(self):
         return self.poison
 
-    def step(self):
-        if self.poison > 0:
-            self.poison -= 0.1
-
     def show(self):
         if self.poison < 5:
             return str(Symbol.CLEAN_WATER)
@@ -122,6 +102,15 @@ class Water(mesa.Agent):
 # entities with minds
 #######################
 
+class AgentBody(GridAgentBody):
+
+    def __init__(self, unique_id, model, position):
+        super().__init__(unique_id, model)
+
+    def moved(self, direction):
+        self.model.events.append((self, direction))
+
+
 class Gatherer(AgentBody):
 
     def __init__(self, unique_id, model, position):
@@ -168,6 +157,77 @@ class Gatherer(AgentBody):
                 self.model.end = True
                 self.trace("I am too hungry (end session).")
 
+#######################
+# world
+#######################
+
+# offsets of the 8 neighbours of a cell
+NEIGHBOURHOOD = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if dx != 0 or dy != 0]
+
+
+def neighbour_sum(plane):
+    """Sum of the values of the 8 neighbours of each cell, on a torus."""
+    total = np.zeros_like(plane)
+    for dx, dy in NEIGHBOURHOOD:
+        total += np.roll(plane, (-dx, -dy), axis=(0, 1))
+    return total
+
+
+def neighbour_product(plane):
+    """Product of the values of the 8 neighbours of each cell, on a torus."""
+    total = np.ones_like(plane)
+    for dx, dy in NEIGHBOURHOOD:
+        total *= np.roll(plane, (-dx, -dy), axis=(0, 1))
+    return total
+
+
+class SacredWaterModel(GridWorldModel):
+
+    grid_type = HashedMultiGrid     # observed as a whole, see get_positions and get_state_hash
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.entities = EntityRegistry(recycle_ids=True)    # fruits are continuously created and eaten
+        self.fields.add_field("poison", rules=[decay(0.1)])
+        self.np_random = np.random.default_rng(self.random.getrandbits(64))
+
+    def step(self):
+        end, events = super().step()
+        self.grow_fruits()
+        return end, events
+
+    def get_planes(self):
+        occupancy = np.zeros((self.width, self.height))
+        fruits = np.zeros((self.width, self.height))
+        for entity in self.entities:
+            x, y = entity.pos
+            occupancy[x, y] += 1
+            if type(entity) == Fruit:
+                fruits[x, y] += 1
+        poison_field = self.fields["poison"]
+        water = poison_field.mask.astype(float)
+        poison = np.where(poison_field.mask, poison_field.values, 0)
+        return occupancy, fruits, water, poison
+
+    def grow_fruits(self):
+        occupancy, fruits, water, poison = self.get_planes()
+
+        # almost arbitrary formula to govern the probability of new fruits to be generated,
+        # computed for each fruit from its neighbourhood
+        near_fruits = 1 + neighbour_sum(fruits)
+        near_water = neighbour_sum(water)
+        near_poison = np.round(neighbour_sum(poison) / 5)
+        prob_new_fruit = np.maximum(near_water - near_poison, 0) * (near_fruits ** 2) / (250 * (4 ** 2))
+
+        # each fruit tries to grow once in each empty neighbour cell:
+        # a cell stays empty only if all the attempts of the fruits around fail
+        no_growth = neighbour_product((1 - np.minimum(prob_new_fruit, 1)) ** fruits)
+        grown = (occupancy == 0) & (self.np_random.random(occupancy.shape) < 1 - no_growth)
+
+        xs, ys = np.nonzero(grown)
+        self.add_entities(Fruit, xs, ys)
+
+
 #######################
 # main
 #######################
@@ -205,7 +265,7 @@ default_map = """
 if __name__ == "__main__":
 
 
-    model = create_world(default_map, symbol_type=Symbol)
+    model = create_world(default_map, symbol_type=Symbol, model_type=SacredWaterModel)
     view = WorldView(model, name="sacred water")
     view.init()
     view.show()
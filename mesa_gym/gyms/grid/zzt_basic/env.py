@@ -18,18 +18,42 @@ class MesaZZTEnv(gym.Env):
         The observation space consists of the perceptual space of each agent.
         The perceptual space is the union of 9 cells array for each relevant item for the item, maintaining the strength
 
+        ### Field of View
+        Agents perceive the cells within `percept_radius` (7x7 cells by default), and with `percept_levels`
+        the 8 surrounding blocks of each coarser level, pooled (see mesa_gym.common.percepts).
+
+        ### Simultaneous Moves
+        With `simultaneous_moves`, all the agents choose their moves from the same state of the world,
+        and the moves are resolved and applied together (see mesa_gym.common.scheduler.SimultaneousMoveActivation):
+        a lion cannot eat a ranger before it has moved.
+
+        ### Episode Truncation
+        With `max_episode_steps`, episodes are truncated after that number of steps,
+        and the info of each agent reports it with a "truncated" key.
+
         ### Arguments
         ```
-        gym.make('MesaZZTEnv-v0', map: string = None)
+        gym.make('MesaZZTEnv-v0', map: string = None, max_episode_steps: int = None, percept_radius: int = 3, percept_levels: int = 0, simultaneous_moves: bool = False)
         ```
     """
 
     metadata = {"render_modes": ["human"], "render_fps": 25}
 
-    def __init__(self, render_mode=None, map=None):
+    # keys that may appear in the info of an agent
+    info_fields = ["energy", "collided", "success", "failure", "truncated"]
+    # attributes of the agents reported in their info (the other keys are events)
+    state_fields = ["energy"]
+
+    def __init__(self, render_mode=None, map=None, max_episode_steps=None, percept_radius=3, percept_levels=0, simultaneous_moves=False):
 
         assert render_mode is None or render_mode in self.metadata["render_modes"]
         self.render_mode = render_mode
+        self.max_episode_steps = max_episode_steps   # None for episodes without limit
+        self.percept_radius = percept_radius
+        self.percept_levels = percept_levels
+        self.simultaneous_moves = simultaneous_moves
+        self.n_steps = 0
+        self.truncated = False
 
         if self.render_mode == "human":
             self.fps = self.metadata["render_fps"]
@@ -73,35 +97,41 @@ class MesaZZTEnv(gym.Env):
             self.observation_space[agent.unique_id] = spaces.Box(features_high, features_low)
 
     def _get_world(self):
-        return mesa_zzt.create_world(self.map)
+        model = mesa_zzt.create_world(self.map, self.simultaneous_moves)
+        model.percept_radius = self.percept_radius
+        model.percept_levels = self.percept_levels
+        return model
 
     def _get_entities(self):
         return self.model.entities
 
     def _get_agents(self):
-        agents = []
-        for entity in self.model.entities:
-            if type(entity) is mesa_zzt.LionAgent or type(entity) is mesa_zzt.RangerAgent:
-                agents.append(entity)
-        return agents
+        return self.model.entities.of_type(mesa_zzt.LionAgent, mesa_zzt.RangerAgent)
 
     def _get_obs(self):
         return { agent.unique_id: agent.get_percepts() for agent in self._get_agents() }
 
     def _get_info(self):
         info = {}
-        for agent in self._get_agents():
+        # agents removed during the step (eg. a ranger eaten by a lion) still get their events
+        removed_agents = [agent for agent in self.events if agent.pos is None]
+        for agent in self._get_agents() + removed_agents:
             if agent.unique_id not in info:
                 info[agent.unique_id] = {}
             info[agent.unique_id]["energy"] = agent.energy
             if agent in self.events:
                 for event in self.events[agent]:
                     info[agent.unique_id][event] = self.events[agent][event]
+            if self.truncated:
+                info[agent.unique_id]["truncated"] = 1
         return info
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
 
+        self.n_steps = 0
+        self.truncated = False
+
         if self.booting:
             self.booting = False
         else:
@@ -117,9 +147,9 @@ class MesaZZTEnv(gym.Env):
 
         return observation, info
 
-    def _get_rewards(self, events):
+    def _get_rewards(self, events, rewards=None):
 
-        rewards = {}
+        rewards = {} if rewards is None else rewards
 
         for agent in self._get_agents():
             rewards[agent.unique_id] = -1               # losing energy for each time step
@@ -150,17 +180,25 @@ class MesaZZTEnv(gym.Env):
         for agent in self._get_agents():
             agent.next_action = self.potential_actions[actions[agent.unique_id]]
 
+        terminated, events = self._step_world()
+
+        rewards = self._get_rewards(events)
+        observation = self._get_obs()
+        info = self._get_info()
+
+        return observation, rewards, terminated, self.truncated, info
+
+    def _step_world(self):
         self.events = {}
         terminated, events = self.model.step()
 
+        self.n_steps += 1
+        self.truncated = not terminated and self.max_episode_steps is not None and self.n_steps >= self.max_episode_steps
+
         if self.render_mode == "human":
             self._render_frame()
 
-        rewards = self._get_rewards(events)
-        observation = self._get_obs()
-        info = self._get_info()
-
-        return observation, rewards, terminated, False, info
+        return terminated, events
 
     def render(self):
         self.view.show()
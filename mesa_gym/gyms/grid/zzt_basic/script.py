@@ -4,21 +4,20 @@ import mesa_gym.gyms.grid.zzt_basic.env as w
 env = w.MesaZZTEnv(render_mode="human")
 
 import numpy as np
-import pickle
+from mesa_gym.trainers.qtable import load_q_table
 
 import os
 path = os.path.dirname(os.path.abspath(__file__))
 
 # add files here if you want to use a trained model
 trained_models = {}
-trained_models[7] = "models/RangerAgent_7_zzt-qlearning_1000_0.05_1.0_0.002_0.1.pickle"
-trained_models[35] = "models/LionAgent_35_zzt-qlearning_1000_0.05_1.0_0.002_0.1.pickle"
+trained_models[0] = "models/RangerAgent_0_zzt-qlearning_1000_0.05_1.0_0.002_0.1.pickle"
+trained_models[11] = "models/LionAgent_11_zzt-qlearning_1000_0.05_1.0_0.002_0.1.pickle"
 
 # load q_tables to use them
 q_tables = {}
 for id in trained_models.keys():
-    with open(trained_models[id], "rb") as f:
-        q_tables[id] = pickle.load(f)
+    q_tables[id] = load_q_table(trained_models[id])
 
 obs, info = env.reset()
 
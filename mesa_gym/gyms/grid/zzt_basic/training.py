@@ -3,7 +3,10 @@ path = os.path.dirname(os.path.abspath(__file__))
 
 # load the target environment
 import mesa_gym.gyms.grid.zzt_basic.env as w
-env = w.MesaZZTEnv(render_mode=None)
+# episodes are truncated after this number of steps (None for no limit)
+max_episode_steps = 1000
+
+env = w.MesaZZTEnv(render_mode=None, max_episode_steps=max_episode_steps)
 
 import gymnasium as gym
 
@@ -21,6 +24,16 @@ print(f"number of states: {nb_states}")
 
 n_episodes = 1_000  # 100_000
 
+# budget of the whole training run, in environment steps and in seconds (None for no limit)
+# when the budget is exhausted, the current episode is truncated and the training stops
+from mesa_gym.trainers.budget import TrainingBudget
+max_training_steps = None
+max_training_seconds = None
+
+# periodic checkpoints of the training run, which is resumed from the last checkpoint when restarted
+from mesa_gym.trainers.checkpoint import Checkpointer
+checkpoint_seconds = 300
+
 # create the trainee agent instances
 
 from tqdm import tqdm
@@ -35,7 +48,10 @@ data["fields"] = []
 def vanilla_learning():
     experiment_name = f"zzt-random_{n_episodes}"
 
+    budget = TrainingBudget(max_steps=max_training_steps, max_seconds=max_training_seconds)
     for episode in tqdm(range(n_episodes)):
+        if budget.exhausted():
+            break
         obs, info = env.reset()
         done = False
 
@@ -45,6 +61,7 @@ def vanilla_learning():
         while not done:
             actions = env.action_space.sample()
             obs, rewards, terminated, truncated, info = env.step(actions)
+            truncated = budget.step() or truncated
 
             # collect data
             data[episode][step] = {}
@@ -80,7 +97,12 @@ def q_learning():
     for agent in agents:
         trainees[agent] = QLearningTrainer(agent=agent, action_space=env.action_space[agent], learning_rate=learning_rate, initial_epsilon=start_epsilon, epsilon_decay=epsilon_decay, final_epsilon=final_epsilon)
 
-    for episode in tqdm(range(n_episodes)):
+    checkpointer = Checkpointer(f"{path}/checkpoints/{experiment_name}", every_seconds=checkpoint_seconds)
+    first_episode = checkpointer.resume(trainees, data)
+    budget = TrainingBudget(max_steps=max_training_steps, max_seconds=max_training_seconds)
+    for episode in tqdm(range(first_episode, n_episodes)):
+        if budget.exhausted():
+            break
         obs, info = env.reset()
         done = False
 
@@ -92,6 +114,7 @@ def q_learning():
             for agent in agents:
                 actions[agent] = trainees[agent].select_action(obs)
             next_obs, rewards, terminated, truncated, info = env.step(actions)
+            truncated = budget.step() or truncated
 
             # collect data
             data[episode][step] = {}
@@ -117,17 +140,22 @@ def q_learning():
         for agent in agents:
             trainees[agent].decay_epsilon()
 
+        checkpointer.step(episode, trainees, data)
+
     return experiment_name, trainees
 
 
 experiment_name, trainees = q_learning()
 
 import pickle
+from mesa_gym.trainers.qtable import save_q_table
 for trainee in trainees:
     filename = f"models/{type_agent[trainee]}_{trainee}_{experiment_name}.pickle"
     with open(f"{path}/{filename}", "wb") as f:
         pickle.dump(trainees[trainee].q_table(), f)
         print(f"trained model saved in {filename}")
+    # memory-mapped copy, for fast loading at inference (see load_q_table)
+    save_q_table(trainees[trainee].q_table(), f"{path}/{filename[:-len('.pickle')]}.qtable")
 
 import pickle
 filename = f"data/{experiment_name}.pickle"
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 
-import mesa
 from enum import Enum
 
+from mesa_gym.common.entity import Entity
+from mesa_gym.common.fields import growth
+from mesa_gym.common.gridworld import GridAgentBody, GridWorldModel, WorldView, create_world as compile_world
+
 
 #######################
 # symbols for map
@@ -66,35 +69,36 @@ class Symbol(Enum):
 # physical entities
 #######################
 
-class Wall(mesa.Agent):
-
-    def __init__(self, unique_id, model, position):
-        super().__init__(unique_id, model)
-        self.model.add_disability(mesa.Agent, "move", self.get_pos)
-
-    def get_pos(self):
-        return self.pos
+class Wall:
 
-    def step(self):
-        pass
+    # walls are not agents, they are compiled into the terrain of the world
+    terrain = True
+    blocking = True
 
-    def show(self):
+    @staticmethod
+    def show():
         return str(Symbol.WALL)
 
 
-class Grass(mesa.Agent):
+class Grass(Entity):
+
+    __slots__ = ()  # the amount of grass is updated by the world, see the "grass" field
 
     def __init__(self, unique_id, model, position, amount=1):
         super().__init__(unique_id, model)
-        self.amount = amount
+        self.model.fields["grass"].place(position, amount)
+
+    @property
+    def amount(self):
+        return self.model.fields["grass"].get(self.pos)
+
+    @amount.setter
+    def amount(self, value):
+        self.model.fields["grass"].set(self.pos, value)
 
     def get_state(self):
         return self.amount
 
-    def step(self):
-        if self.amount <= 30:
-            self.amount += 1
-
     def show(self):
         if self.amount == 0:
             return " "
@@ -106,80 +110,26 @@ class Grass(mesa.Agent):
             return str(Symbol.MOREGRASS)
 
 
-class Diamond(mesa.Agent):
+class Diamond(Entity):
+
+    __slots__ = ()
 
     def __init__(self, unique_id, model, position):
         super().__init__(unique_id, model)
 
-    def step(self):
-        pass
-
     def show(self):
         return str(Symbol.DIAMOND)
 
-    def destroy(self):
-        self.model.remove_entity(self)
-
 
-class AgentBody(mesa.Agent):
+class AgentBody(GridAgentBody):
 
     def __init__(self, unique_id, model, position):
         super().__init__(unique_id, model)
         self.energy = 999
-        self.mental_init()
-
-    def get_pos(self):
-        return self.pos
 
     def get_state(self):
         return self.energy
 
-    @staticmethod
-    def get_directions():
-        directions = []
-        for i in range(-1, 2):
-            for j in range (-1, 2):
-                directions.append((i, j))
-        return directions
-
-    def get_percepts(self, radius=3):
-
-        if self.pos is None: # case in which the agent has been destroyed # TODO, get percepts should not be called in this case!
-            return []
-
-        relevant_entities = self._get_relevant_entities()
-
-        if relevant_entities is None:
-            raise RuntimeWarning("An agent has been initialized not paying attention to any entity.")
-
-        percepts_about = {}
-        for entity_type in relevant_entities:
-            percepts_about[entity_type] = []
-
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                absx, absy = self.pos
-                x = (absx + dx) % self.model.width
-                y = (absy + dy) % self.model.height
-
-                strength_concerning = {}
-                for entity_type in relevant_entities:
-                    strength_concerning[entity_type] = 0
-
-                for item in self.model.grid.get_cell_list_contents((x, y)):
-                    entity_type = type(item)
-                    if entity_type in relevant_entities:
-                        strength_concerning[entity_type] += 1
-
-                for entity_type in relevant_entities:
-                    percepts_about[entity_type].append(strength_concerning[entity_type])
-
-        percepts = []
-        for entity_type in relevant_entities:
-            percepts += percepts_about[entity_type]
-
-        return percepts
-
     def react(self):
         elems = self.model.grid.get_cell_list_contents([self.pos])
         for elem in elems:
@@ -202,48 +152,20 @@ class AgentBody(mesa.Agent):
                         self.model.end = True
 
     def move(self, direction):
-        dx, dy = direction
-        absx, absy = self.pos
-        x = absx + dx
-        y = absy + dy
-        disabilities = self.model.disabilities[mesa.Agent]["move"]
-        if (x, y) not in [disabled() for disabled in disabilities]:
-            self.model.grid.move_agent(self, (x, y))
-        else:
-            self.model.events.append((self, False))
-            self.trace("action 'move' failed")
+        super().move(direction)
         self.energy -= 1
 
-    def step(self):
+    def act(self):
         if self.energy == 0:
             self.model.end = True
-            return
-        else:
-            self.trace(f"energy: {self.energy}")
-            self.mental_step()
-
-        self.react()
-
-    def trace(self, text):
-        self.model.console.append(f"{type(self).__name__} {self.unique_id} > {text}                                    ")
-
-    def destroy(self):
-        pass
-
-    def mental_init(self):
-        self.next_action = None
-
-    def _get_relevant_entities(self):
-        return None
+            return False
+        self.trace(f"energy: {self.energy}")
+        return super().act()
 
     def mental_step(self):
         percepts = self.get_percepts()
         self.trace(f"percepts: {percepts}")
-        if self.next_action is None:
-            self.next_action = self.random.choice(self.get_directions())
-        self.trace(f"next action: {self.next_action}")
-        self.move(self.next_action)
-        self.next_action = None
+        super().mental_step()
 
     def show(self):
         raise RuntimeError("Not defined symbol.")
@@ -290,154 +212,21 @@ class LionAgent(AgentBody):
 # world
 #######################
 
-class WorldModel(mesa.Model):
-
-    def __init__(self, width, height):
-        self.entities = []
-        self.disabilities = {}
-        self.width = width
-        self.height = height
-        self.schedule = mesa.time.RandomActivation(self)
-        self.grid = mesa.space.MultiGrid(width, height, True)
-        self.end = False
-        self.console = []
-
-    def step(self):
-        self.events = []
-        self.schedule.step()
-        return self.end, self.events
-
-    def add_entity(self, entity_type, x, y):
-        entity = entity_type(len(self.entities), self, (x, y))
-        self.grid.place_agent(entity, (x, y))
-        self.schedule.add(entity)
-        self.entities.append(entity)
-
-    def add_disability(self, entity_type, action, callable_for_value):
-        if entity_type not in self.disabilities:
-            self.disabilities[entity_type] = {}
-        if action not in self.disabilities[entity_type]:
-            self.disabilities[entity_type][action] = []
-        self.disabilities[entity_type][action].append(callable_for_value)
-
-    def remove_entity(self, entity):
-        self.grid.remove_agent(entity)
-        self.schedule.remove(entity)
-
-    def remove_disability(self, entity_type, action, callable_for_value):
-        self.disabilities[entity_type][action].remove(callable_for_value)
-
-
-#######################
-# viewer
-#######################
-
-import time
-
-
-def move(x, y):
-    print("\033[%d;%dH" % (y, x))
-
-
-class WorldView:
-    def __init__(self, world_model, fps=25):
-        self.world = world_model
-
-        # from frame per second (fps) toseconds per frame (ms)
-        # eg. 25 f/s = 1/25 s/f = 1000/25 ms/f = 40 ms/f
-        self.delay = 1/fps
-
-    def init(self):
-        print('\x1b[2J')
+class WorldModel(GridWorldModel):
 
-    def header(self):
-        move(0, 0)
-        print("mesagym -- minimal gym built on top on mesa\n")
-
-    def show(self, reverse_order=False):
-        self.header()
-        string = ""
-
-        string += "|"
-        for i in range(0, self.world.height):
-            string += "-"
-        string += "|\n"
-
-        # for how mesa furnish the coordinate
-        # we have to print the transpose of the world
-        for cell in self.world.grid.coord_iter():
-            cell_content, (x, y) = cell
-            if y == 0:
-                string += "|"
-            if len(cell_content) > 0:
-                found = False
-                for entity in cell_content:
-                    if isinstance(entity, AgentBody):
-                        string += entity.show()
-                        found = True
-                        break
-                if not found:
-                    string += cell_content[0].show()
-            else:
-                string += " "
-            if y == self.world.height - 1:
-                string += "|\n"
-
-        string += "|"
-        for i in range(0, self.world.height):
-            string += "-"
-        string += "|\n"
-
-        print(string)
-
-        print(">>> console <<<")
-
-        if reverse_order:
-            console = reversed(self.world.console[-5:])
-        else:
-            console = self.world.console[-5:]
-        for item in console:
-            print(item)
+    percept_radius = 3
 
-        time.sleep(self.delay)
+    def __init__(self, width, height, simultaneous=False):
+        super().__init__(width, height, simultaneous)
+        self.fields.add_field("grass", rules=[growth(1, up_to=30)])
 
 
 #######################
 # helpers
 #######################
 
-def create_world(map):
-    # remove trailing new line at the beginning
-    if map[0] == "\n": map = map[1:]
-
-    width = map.index("\n") - 2  # accounting for the borders
-    if width == 0:
-        raise ValueError("Unexpected dimensions of the map.")
-
-    height = int(len(map) / (width + 3)) - 2  # accounting for the borders and newlines
-    if height == 0 or len(map) % (width + 3) != 0:
-        raise ValueError("Unexpected dimensions of the map.")
-
-    # print(f"loading map on a {width}x{height} grid...")
-
-    model = WorldModel(height, width)
-
-    x = 0
-    y = 0
-    for z, ch in enumerate(map):
-        if width + 3 < z < len(map) - width - 3:
-            if 0 < z % (width + 3) <= width:
-                if ch == " ":
-                    pass
-                else:
-                    entity_type = Symbol.symbol_to_entity(ch)
-                    model.add_entity(entity_type, x, y)
-                y += 1
-            if z % (width + 3) == 0:
-                x += 1
-                y = 0
-
-    return model
+def create_world(map, simultaneous=False):
+    return compile_world(map, Symbol, WorldModel, simultaneous=simultaneous)
 
 
 #######################
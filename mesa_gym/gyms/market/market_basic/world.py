@@ -3,6 +3,9 @@
 import mesa
 from enum import Enum
 
+from mesa_gym.common.registry import EntityRegistry
+from mesa_gym.common.scheduler import TimerRandomActivation
+
 ###########################
 # language between agents
 ###########################
@@ -53,9 +56,13 @@ class OrderBook:
     def acknowledge_offeror(self, offeree, proposal):
         offeror = proposal.agent
         offeror.messages.append(Message(offeree, "accepted", proposal))
+        offeror.model.schedule.wake(offeror)
 
     def step(self):
-        for msg in self.messages:
+        # messages are consumed, so that each is processed once
+        messages = self.messages
+        self.messages = []
+        for msg in messages:
             if msg.action == "buy":
                 self.add_demand(msg.agent, msg.refinement)
             elif msg.action == "sell":
@@ -92,6 +99,19 @@ class AgentBody(mesa.Agent):
     def accept(self, proposal):
         self.model.orderbook.messages.append(Message(self, "accept", proposal))
 
+    def read_messages(self):
+        messages = self.messages
+        self.messages = []
+        return messages
+
+    def wait_offer(self):
+        # the agent sleeps until the offer expires, or until the orderbook wakes it up with an acceptance
+        self.deadline = self.model.schedule.steps + self.timeout
+        self.model.schedule.sleep(self, until=self.deadline)
+
+    def offer_expired(self):
+        return self.model.schedule.steps >= self.deadline
+
     def step(self):
         self.mental_step()
 
@@ -188,14 +208,14 @@ class ZeroIntelligentSeller(AgentBody):
             self.timeout = 10
             self.trace(f"offering asset for {self.myprice}")
             self.sell(self.myprice)
+            self.wait_offer()
         else:
-            for msg in self.messages:
+            for msg in self.read_messages():
                 if msg.action == "accepted":
                     self.trace(f"offer accepted by {msg.agent}")
                     self.offering = False
             if self.offering:
-                self.timeout -= 1
-                if self.timeout == 0:
+                if self.offer_expired():
                     self.offering = False
 
 
@@ -213,15 +233,15 @@ class ZeroIntelligentPlusSeller(AgentBody):
             self.timeout = 10
             self.trace(f"offering asset for {self.myprice}")
             self.sell(self.myprice)
+            self.wait_offer()
         else:
-            for msg in self.messages:
+            for msg in self.read_messages():
                 if msg.action == "accepted":
                     self.trace(f"offer accepted by {msg.agent}")
                     self.offering = False
                     self.myprice += 1
             if self.offering:
-                self.timeout -= 1
-                if self.timeout == 0:
+                if self.offer_expired():
                     self.myprice -= 1
                     self.offering = False
 
@@ -233,10 +253,10 @@ class ZeroIntelligentPlusSeller(AgentBody):
 class WorldModel(mesa.Model):
 
     def __init__(self, orderbook):
-        self.entities = []
+        self.entities = EntityRegistry()
         self.orderbook = orderbook
         self.disabilities = {}
-        self.schedule = mesa.time.RandomActivation(self)        
+        self.schedule = TimerRandomActivation(self)        
         self.end = False
         self.console = []
 
@@ -246,9 +266,9 @@ class WorldModel(mesa.Model):
         return self.end
 
     def add_entity(self, Entity_type, params=None):
-        entity = Entity_type(len(self.entities), self, params)    
+        entity = Entity_type(self.entities.next_id(), self, params)
         self.schedule.add(entity)
-        self.entities.append(entity)
+        self.entities.add(entity)
 
     def add_disability(self, Entity_type, action, value):
         if Entity_type not in self.disabilities:
@@ -259,6 +279,7 @@ class WorldModel(mesa.Model):
 
     def remove_entity(self, entity):
         self.schedule.remove(entity)
+        self.entities.remove(entity)
 
     def remove_disability(self, Entity_type, action, value):
         self.disabilities[Entity_type][action].remove(value)
@@ -3,6 +3,7 @@ import math
 import random
 from collections import namedtuple, deque
 
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -30,6 +31,120 @@ class ReplayMemory(object):
     def __len__(self):
         return len(self.memory)
 
+    def transitions(self):
+        return list(self.memory)
+
+    def load(self, transitions, priorities=None):
+        self.memory.clear()
+        self.memory.extend(transitions)
+
+
+class SumTree:
+    """Array-based binary tree of priorities, each node holding the sum of its children: the leaves
+    (one per slot of the memory) start at index `n_leaves`, and the root is at index 1.
+    Updates and searches take O(log n), and are vectorized over batches of slots."""
+
+    def __init__(self, capacity):
+        self.n_leaves = 1
+        while self.n_leaves < capacity:
+            self.n_leaves *= 2
+        self.tree = np.zeros(2 * self.n_leaves)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, slots):
+        return self.tree[self.n_leaves + np.asarray(slots)]
+
+    def update(self, slots, priorities):
+        nodes = self.n_leaves + np.asarray(slots)
+        self.tree[nodes] = priorities
+        # the parents of the updated nodes are recomputed level by level, each once
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Slots whose cumulated priorities (in slot order) reach the given values, in [0, total)."""
+        values = np.array(values, dtype=float)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.n_leaves:
+            left = self.tree[2 * nodes]
+            right = values >= left
+            values -= left * right
+            nodes = 2 * nodes + right
+        return nodes - self.n_leaves
+
+
+class PrioritizedReplayMemory:
+    """Replay memory sampling the transitions in proportion to their priority (|TD error| + eps) ** alpha,
+    with the importance-sampling weights correcting the bias, whose exponent beta is annealed to 1.
+
+    New transitions get the highest priority seen so far, so that they are replayed at least once."""
+
+    def __init__(self, capacity, alpha=0.6, beta=0.4, beta_steps=100000, eps=1e-3):
+        self.capacity = capacity
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = (1.0 - beta) / beta_steps
+        self.eps = eps
+        self.tree = SumTree(capacity)
+        self.memory = [None] * capacity
+        self.next_slot = 0
+        self.size = 0
+        self.max_priority = 1.0
+
+    def push(self, *args, priority=None):
+        """Save a transition"""
+        self.memory[self.next_slot] = Transition(*args)
+        self.tree.update([self.next_slot], [self.max_priority if priority is None else priority])
+        self.next_slot = (self.next_slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """Transitions drawn in proportion to their priority (one in each of `batch_size` equal segments
+        of the total priority), their slots and their normalized importance-sampling weights."""
+        total = self.tree.total
+        values = (np.arange(batch_size) + np.random.random(batch_size)) * (total / batch_size)
+        slots = np.minimum(self.tree.find(np.minimum(values, np.nextafter(total, 0))), self.size - 1)
+
+        probabilities = self.tree.get(slots) / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return [self.memory[slot] for slot in slots], slots, weights
+
+    def update_priorities(self, slots, errors):
+        priorities = (np.abs(errors) + self.eps) ** self.alpha
+        self.tree.update(slots, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def __len__(self):
+        return self.size
+
+    def transitions(self):
+        # oldest first
+        start = self.next_slot if self.size == self.capacity else 0
+        return [self.memory[(start + i) % self.capacity] for i in range(self.size)]
+
+    def priorities(self):
+        start = self.next_slot if self.size == self.capacity else 0
+        return self.tree.get((start + np.arange(self.size)) % self.capacity).tolist()
+
+    def load(self, transitions, priorities=None):
+        self.tree = SumTree(self.capacity)
+        self.memory = [None] * self.capacity
+        self.next_slot = 0
+        self.size = 0
+        self.max_priority = 1.0
+        for i, transition in enumerate(transitions):
+            self.push(*transition, priority=None if priorities is None else priorities[i])
+        if priorities:
+            self.max_priority = max(priorities)
+
 
 class DQN(nn.Module):
 
@@ -47,6 +162,65 @@ class DQN(nn.Module):
         return self.layer3(x)
 
 
+class ConvDQN(nn.Module):
+    """DQN over observations made of occupancy planes (one per entity type, as given by get_positions),
+    reshaped to (channels, height, width): a small stack of convolutions wrapping around the torus,
+    then global (mean and max) pooling. Its parameters do not depend on the size of the grid, so that
+    the cost stays bounded on large maps and a trained network can be used on other map sizes
+    (see set_grid_shape)."""
+
+    def __init__(self, n_channels, grid_shape, n_actions):
+        super(ConvDQN, self).__init__()
+        self.register_buffer("grid_shape", torch.tensor(grid_shape))
+        # each convolution halves the resolution: the cost is a fraction of a dense layer over the cells
+        self.conv1 = nn.Conv2d(n_channels, 16, 3, stride=2, padding=1, padding_mode="circular")
+        self.conv2 = nn.Conv2d(16, 32, 3, stride=2, padding=1, padding_mode="circular")
+        self.conv3 = nn.Conv2d(32, 32, 3, stride=2, padding=1, padding_mode="circular")
+        self.layer1 = nn.Linear(2 * 32, 128)
+        self.layer2 = nn.Linear(128, n_actions)
+
+    def set_grid_shape(self, height, width):
+        self.grid_shape.copy_(torch.tensor((height, width)))
+
+    def forward(self, x):
+        height, width = self.grid_shape.tolist()
+        x = x.view(x.shape[0], -1, height, width)
+        x = F.relu(self.conv1(x))
+        x = F.relu(self.conv2(x))
+        x = F.relu(self.conv3(x))
+        x = torch.cat([x.mean(dim=(2, 3)), x.amax(dim=(2, 3))], dim=1)
+        x = F.relu(self.layer1(x))
+        return self.layer2(x)
+
+
+# encoders of the observations, see make_dqn
+ENCODERS = ["mlp", "conv"]
+
+
+def make_dqn(n_observations, n_actions, encoder="mlp", grid_shape=None):
+    """DQN network for flat observations ("mlp"), or for occupancy planes on a grid of shape (height, width) ("conv")."""
+    if encoder == "mlp":
+        return DQN(n_observations, n_actions)
+    if encoder == "conv":
+        if grid_shape is None:
+            raise RuntimeError("The convolutional encoder requires the shape of the grid.")
+        height, width = grid_shape
+        if n_observations % (height * width) != 0:
+            raise RuntimeError(f"Observations of size {n_observations} are not planes of {height}x{width} cells.")
+        return ConvDQN(n_observations // (height * width), (height, width), n_actions)
+    raise RuntimeError(f"Unknown encoder '{encoder}'.")
+
+
+def load_dqn(state_dict, n_observations, n_actions):
+    """DQN network with the given parameters, whatever its encoder."""
+    if "grid_shape" in state_dict:
+        model = make_dqn(n_observations, n_actions, "conv", state_dict["grid_shape"].tolist())
+    else:
+        model = make_dqn(n_observations, n_actions)
+    model.load_state_dict(state_dict)
+    return model
+
+
 class DQNTrainer:
 
     def __init__(self, agent, action_space, observation_space,
@@ -56,7 +230,10 @@ class DQNTrainer:
                  final_epsilon,
                  epsilon_decay,
                  update_rate,
-                 learning_rate):
+                 learning_rate,
+                 prioritized_replay=False,
+                 encoder="mlp",
+                 grid_shape=None):
 
         self.agent = agent
         self.action_space = action_space
@@ -68,23 +245,31 @@ class DQNTrainer:
         self.epsilon_decay = epsilon_decay
         self.update_rate = update_rate
         self.learning_rate = learning_rate
+        self.prioritized_replay = prioritized_replay
+        self.encoder = encoder
 
         nb_actions = gym.spaces.flatdim(action_space)
         nb_states = gym.spaces.flatdim(observation_space)
 
-        self.policy_net = DQN(nb_states, nb_actions).to(device)
-        self.target_net = DQN(nb_states, nb_actions).to(device)
+        self.policy_net = make_dqn(nb_states, nb_actions, encoder, grid_shape).to(device)
+        self.target_net = make_dqn(nb_states, nb_actions, encoder, grid_shape).to(device)
         self.target_net.load_state_dict(self.policy_net.state_dict())
 
         self.optimizer = optim.AdamW(self.policy_net.parameters(), lr=self.learning_rate, amsgrad=True)
-        self.memory = ReplayMemory(10000)
+        # with prioritized replay, rare transitions (eg. the reward of a goal) are replayed more often
+        self.memory = PrioritizedReplayMemory(10000) if prioritized_replay else ReplayMemory(10000)
 
         self.steps_done = 0
 
+    def epsilon(self, steps_done=None):
+        """Exploration rate after the given number of steps (by default, the steps done by the trainer)."""
+        steps_done = self.steps_done if steps_done is None else steps_done
+        return self.final_epsilon + (self.initial_epsilon - self.final_epsilon) * \
+               math.exp(-1. * steps_done / self.epsilon_decay)
+
     def select_action(self, state):
         sample = random.random()
-        eps_threshold = self.final_epsilon + (self.initial_epsilon - self.final_epsilon) * \
-                        math.exp(-1. * self.steps_done / self.epsilon_decay)
+        eps_threshold = self.epsilon()
 
         self.steps_done += 1
         if sample > eps_threshold:
@@ -101,7 +286,10 @@ class DQNTrainer:
 
         if len(self.memory) < self.replay_batch_size:
             return
-        transitions = self.memory.sample(self.replay_batch_size)
+        if self.prioritized_replay:
+            transitions, slots, weights = self.memory.sample(self.replay_batch_size)
+        else:
+            transitions = self.memory.sample(self.replay_batch_size)
 
         # Transpose the batch (see https://stackoverflow.com/a/19343/3343043 for
         # detailed explanation). This converts batch-array of Transitions
@@ -133,8 +321,15 @@ class DQNTrainer:
         expected_state_action_values = (next_state_values * self.discount_factor) + reward_batch
 
         # Compute Huber loss
-        criterion = nn.SmoothL1Loss()
-        loss = criterion(state_action_values, expected_state_action_values.unsqueeze(1))
+        if self.prioritized_replay:
+            # weighted by importance sampling, and the TD errors give the new priorities
+            errors = state_action_values - expected_state_action_values.unsqueeze(1)
+            self.memory.update_priorities(slots, errors.detach().squeeze(1).cpu().numpy())
+            losses = F.smooth_l1_loss(state_action_values, expected_state_action_values.unsqueeze(1), reduction="none")
+            loss = (torch.tensor(weights, device=device, dtype=losses.dtype).unsqueeze(1) * losses).mean()
+        else:
+            criterion = nn.SmoothL1Loss()
+            loss = criterion(state_action_values, expected_state_action_values.unsqueeze(1))
 
         # Optimize the model
         self.optimizer.zero_grad()
@@ -142,3 +337,41 @@ class DQNTrainer:
         # In-place gradient clipping
         torch.nn.utils.clip_grad_value_(self.policy_net.parameters(), 100)
         self.optimizer.step()
+
+    def soft_update(self):
+        """Soft update of the target network's weights: θ′ ← τ θ + (1 −τ )θ′, with τ the update rate."""
+        target_net_state_dict = self.target_net.state_dict()
+        policy_net_state_dict = self.policy_net.state_dict()
+        for key in policy_net_state_dict:
+            # buffers that are not weights (eg. the grid shape of ConvDQN) are copied
+            if not policy_net_state_dict[key].is_floating_point():
+                target_net_state_dict[key] = policy_net_state_dict[key]
+                continue
+            target_net_state_dict[key] = policy_net_state_dict[key] * self.update_rate + \
+                                         target_net_state_dict[key] * (1 - self.update_rate)
+        self.target_net.load_state_dict(target_net_state_dict)
+
+    def get_state(self, full=True):
+        """Returns the state of the trainer to be checkpointed: the networks are always saved in full,
+        the replay memory (whose size is the capacity) only if `full`, that is on compactions."""
+
+        state = {
+            "full": full,
+            "policy_net": self.policy_net.state_dict(),
+            "target_net": self.target_net.state_dict(),
+            "optimizer": self.optimizer.state_dict(),
+            "steps_done": self.steps_done,
+        }
+        if full:
+            state["memory"] = self.memory.transitions()
+            state["priorities"] = self.memory.priorities() if self.prioritized_replay else None
+        return state
+
+    def set_state(self, state):
+        """Restores a state returned by get_state; if not full, the replay memory is the one of the last full state."""
+        self.policy_net.load_state_dict(state["policy_net"])
+        self.target_net.load_state_dict(state["target_net"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        if "memory" in state:
+            self.memory.load(state["memory"], state.get("priorities"))
+        self.steps_done = state["steps_done"]
@@ -0,0 +1,197 @@
+import copy
+import multiprocessing
+import queue
+import random
+import traceback
+
+import numpy as np
+
+from mesa_gym.trainers.sweep import agent_keys, agent_obs, make_env, seed_world, total_reward
+
+
+# actor-learner training of DQN: actor processes run copies of the environment with their own copy of
+# the policy networks, and stream their transitions to the learner, which owns the replay memories and
+# the optimization. The learner broadcasts its networks through tensors in shared memory, which the
+# actors copy periodically: simulation and learning overlap, and the simulation scales with the cpus.
+# Runs are not reproducible, as the interleaving of actors and learner depends on the scheduling.
+
+
+#######################
+# actors
+#######################
+
+def _actor(index, gym, env_kwargs, n_episodes, seed, trainers, shared, lock, version, messages, stop, config):
+    # the learner is always told that the actor ended, with the traceback if it failed
+    failure = None
+    try:
+        _play(gym, env_kwargs, n_episodes, seed, trainers, shared, lock, version, messages, stop, config)
+    except BaseException:
+        failure = traceback.format_exc()
+        raise
+    finally:
+        messages.put(("done", index) if failure is None else ("error", (index, failure)))
+
+
+def _play(gym, env_kwargs, n_episodes, seed, trainers, shared, lock, version, messages, stop, config):
+    import torch
+
+    torch.set_num_threads(1)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    env = make_env(gym, env_kwargs)
+    nets = {key: copy.deepcopy(net) for key, net in shared.items()}
+    synced = None
+    steps = 0
+
+    def sync():
+        nonlocal synced
+        with lock:
+            if version.value != synced:
+                for key, net in nets.items():
+                    net.load_state_dict(shared[key].state_dict())
+                synced = version.value
+
+    for episode in range(n_episodes):
+        if stop.is_set():
+            break
+        obs, info = env.reset(seed=seed if episode == 0 else None)
+        seed_world(env)
+        keys = {unique_id: key for unique_id, key in agent_keys(env).items() if key in nets}
+        states = {unique_id: agent_obs(obs, unique_id) for unique_id in keys}
+
+        batch = []
+        episode_reward = 0
+        length = 0
+        done = False
+        while not done:
+            if steps % config["sync_every"] == 0:
+                sync()
+            actions = {}
+            for unique_id, key in keys.items():
+                if states[unique_id] is None:
+                    continue
+                # exploration decays with the steps of all the actors, as with a single DQNTrainer
+                if random.random() > trainers[key].epsilon(steps * config["n_actors"]):
+                    with torch.no_grad():
+                        state = torch.tensor(np.asarray(states[unique_id], dtype=np.float32)).unsqueeze(0)
+                        actions[unique_id] = int(nets[key](state).argmax(1))
+                else:
+                    actions[unique_id] = random.randrange(trainers[key].action_space.n)
+
+            obs, rewards, terminated, truncated, info = env.step(actions)
+            done = terminated or truncated
+            steps += 1
+            length += 1
+            episode_reward += total_reward(rewards)
+
+            for unique_id, action in actions.items():
+                next_state = None if terminated else agent_obs(obs, unique_id)   # None also when removed
+                reward = float(np.sum(rewards.get(unique_id, 0)))
+                batch.append((keys[unique_id], np.asarray(states[unique_id], dtype=np.float32), action,
+                              None if next_state is None else np.asarray(next_state, dtype=np.float32), reward))
+                states[unique_id] = next_state
+
+            if len(batch) >= config["chunk_size"]:
+                messages.put(("transitions", batch))
+                batch = []
+
+        messages.put(("transitions", batch))
+        messages.put(("episode", (episode_reward, length)))
+
+
+#######################
+# learner
+#######################
+
+def train_actor_learner(gym, trainer_kwargs, n_episodes, n_actors=2, env_kwargs=None, seed=0,
+                        sync_every=100, chunk_size=32, timeout=5):
+    """Trains one DQNTrainer per agent (keyed as in the sweeps) over `n_episodes` episodes played by
+    `n_actors` actor processes, the calling process being the learner. The actors update their networks
+    from the learner every `sync_every` of their steps, and send their transitions by chunks.
+    The actors are checked every `timeout` seconds without transitions: if one failed, so does the training.
+
+    Returns the trainers, and the total reward and length of each episode (in order of completion)."""
+    import torch
+    from gymnasium import spaces
+    from mesa_gym.trainers.DQN import DQNTrainer, device
+
+    torch.manual_seed(seed)
+    env = make_env(gym, env_kwargs)
+    obs, info = env.reset()
+    trainers = {}
+    for unique_id, key in agent_keys(env).items():
+        # sized on the actual observations, as the spaces declared by some envs are wider
+        observation_space = spaces.Box(-np.inf, np.inf, (len(agent_obs(obs, unique_id)),))
+        trainers[key] = DQNTrainer(agent=key, observation_space=observation_space,
+                                   action_space=env.action_space[unique_id], **trainer_kwargs)
+    env.close()
+
+    # networks broadcast to the actors, updated by the learner
+    shared = {key: copy.deepcopy(trainer.policy_net).cpu().share_memory() for key, trainer in trainers.items()}
+    lock = multiprocessing.Lock()
+    version = multiprocessing.Value("l", 0, lock=False)
+    messages = multiprocessing.Queue(maxsize=8 * n_actors)     # actors wait when the learner lags behind
+    stop = multiprocessing.Event()
+    config = {
+        "n_actors": n_actors,
+        "sync_every": sync_every,
+        "chunk_size": chunk_size,
+    }
+
+    # the actors take from the trainers their exploration schedule and their actions
+    episodes = [n_episodes // n_actors + (1 if i < n_episodes % n_actors else 0) for i in range(n_actors)]
+    actors = [multiprocessing.Process(target=_actor, daemon=True,
+                                      args=(i, gym, env_kwargs, episodes[i], seed + 1 + i, trainers, shared, lock, version, messages, stop, config))
+              for i in range(n_actors)]
+    for actor in actors:
+        actor.start()
+
+    def to_tensor(state):
+        return None if state is None else torch.tensor(state, device=device).unsqueeze(0)
+
+    episode_rewards = []
+    episode_lengths = []
+    updates = 0
+    running = n_actors
+    try:
+        while running > 0:
+            try:
+                kind, content = messages.get(timeout=timeout)
+            except queue.Empty:
+                # actors killed without notice (eg. out of memory)
+                for i, actor in enumerate(actors):
+                    if not actor.is_alive() and actor.exitcode != 0:
+                        raise RuntimeError(f"Actor {i} died with exit code {actor.exitcode}.")
+                continue
+            if kind == "error":
+                index, failure = content
+                raise RuntimeError(f"Actor {index} failed:\n{failure}")
+            elif kind == "done":
+                running -= 1
+            elif kind == "episode":
+                episode_rewards.append(content[0])
+                episode_lengths.append(content[1])
+            else:
+                for key, state, action, next_state, reward in content:
+                    trainers[key].memory.push(to_tensor(state), torch.tensor([[action]], device=device, dtype=torch.long),
+                                              to_tensor(next_state), torch.tensor([reward], device=device))
+                    trainers[key].optimize_model()
+                    trainers[key].soft_update()
+                updates += len(content)
+
+                if updates >= sync_every * (version.value + 1):
+                    with lock:
+                        for key, trainer in trainers.items():
+                            shared[key].load_state_dict(trainer.policy_net.state_dict())
+                        version.value += 1
+    finally:
+        stop.set()
+        for actor in actors:
+            # actors still waiting to send are not waited for
+            actor.join(timeout=10)
+            if actor.is_alive():
+                actor.terminate()
+
+    return trainers, episode_rewards, episode_lengths
@@ -0,0 +1,31 @@
+import time
+
+
+class TrainingBudget:
+
+    def __init__(self, max_steps: int = None, max_seconds: float = None):
+        """Initialize a budget for a training run, in total environment steps
+        and/or in wall-clock seconds (None for no limit)."""
+
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+
+        self.steps = 0
+        self.start_time = time.monotonic()
+
+    def step(self) -> bool:
+        """Counts one environment step, returns True if the budget is exhausted
+        (the current episode should then be truncated)."""
+
+        self.steps += 1
+        return self.exhausted()
+
+    def exhausted(self) -> bool:
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return True
+        if self.max_seconds is not None and self.elapsed() >= self.max_seconds:
+            return True
+        return False
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
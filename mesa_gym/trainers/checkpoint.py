@@ -0,0 +1,140 @@
+import os
+import pickle
+import random
+import sys
+import time
+
+import numpy as np
+
+
+class Checkpointer:
+    """Periodic, atomic and incremental checkpoints of a training run.
+
+    Each checkpoint writes a delta file with what changed since the previous one (the
+    q-values updated, the episodes added to the experiment data, the full state of the
+    trainers that do not support increments), then atomically replaces the manifest listing
+    the deltas to be applied in order. A crash while checkpointing leaves the previous
+    checkpoint valid. Every `compact_every` checkpoints, a full snapshot replaces the deltas.
+
+    Trainers are given as a dict name -> trainer, implementing `get_state(full)` and `set_state(state)`."""
+
+    def __init__(self, directory, every_seconds=300, every_episodes=None, compact_every=20):
+        self.directory = directory
+        self.every_seconds = every_seconds
+        self.every_episodes = every_episodes
+        self.compact_every = compact_every
+
+        self.deltas = []
+        self.counter = 0
+        self.saved_episodes = 0     # number of episodes of the experiment data already saved
+        self.last_episode = None
+        self.last_time = time.monotonic()
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _write(self, filename, content):
+        # written aside and renamed, so that the file is either the old or the new one
+        tmp = self._path(filename + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(filename))
+
+    def due(self, episode):
+        if self.every_episodes is not None and self.last_episode is not None \
+                and episode - self.last_episode >= self.every_episodes:
+            return True
+        if self.every_seconds is not None and time.monotonic() - self.last_time >= self.every_seconds:
+            return True
+        return False
+
+    def step(self, episode, trainers, data=None):
+        """To be called at the end of each episode, saves a checkpoint when due."""
+        if self.last_episode is None:
+            self.last_episode = episode - 1
+        if self.due(episode):
+            self.save(episode, trainers, data)
+
+    def save(self, episode, trainers, data=None):
+        """Saves the state after the given episode (counted from 0)."""
+        os.makedirs(self.directory, exist_ok=True)
+        full = len(self.deltas) == 0 or len(self.deltas) >= self.compact_every
+
+        delta = {
+            "trainers": {name: trainer.get_state(full=full) for name, trainer in trainers.items()},
+            "data": None,
+        }
+        if data is not None:
+            first = 0 if full else self.saved_episodes
+            delta["data"] = {
+                "fields": list(data.get("fields", [])),
+                "episodes": {e: data[e] for e in range(first, episode + 1) if e in data},
+            }
+            self.saved_episodes = episode + 1
+
+        filename = f"delta_{self.counter:06d}.pickle"
+        self.counter += 1
+        self._write(filename, delta)
+
+        old_deltas = self.deltas if full else []
+        self.deltas = [filename] if full else self.deltas + [filename]
+        self._write("manifest.pickle", {
+            "episode": episode,
+            "deltas": self.deltas,
+            "counter": self.counter,
+            "rng": get_rng_states(),
+        })
+        for old in old_deltas:
+            os.remove(self._path(old))
+
+        self.last_episode = episode
+        self.last_time = time.monotonic()
+
+    def resume(self, trainers, data=None):
+        """Restores the last checkpoint, if any, into the trainers and the experiment data.
+        Returns the episode to start from (0 if there is no checkpoint)."""
+        if not os.path.exists(self._path("manifest.pickle")):
+            return 0
+
+        with open(self._path("manifest.pickle"), "rb") as f:
+            manifest = pickle.load(f)
+
+        for filename in manifest["deltas"]:
+            with open(self._path(filename), "rb") as f:
+                delta = pickle.load(f)
+            for name, state in delta["trainers"].items():
+                if name not in trainers:
+                    raise RuntimeError(f"Trainer '{name}' found in the checkpoint but not in the training run.")
+                trainers[name].set_state(state)
+            if data is not None and delta["data"] is not None:
+                data["fields"] = delta["data"]["fields"]
+                data.update(delta["data"]["episodes"])
+
+        set_rng_states(manifest["rng"])
+
+        self.deltas = manifest["deltas"]
+        self.counter = manifest["counter"]
+        self.saved_episodes = manifest["episode"] + 1
+        self.last_episode = manifest["episode"]
+        self.last_time = time.monotonic()
+        return manifest["episode"] + 1
+
+
+#######################
+# random number generators
+#######################
+
+def get_rng_states():
+    states = {"random": random.getstate(), "numpy": np.random.get_state()}
+    if "torch" in sys.modules:
+        states["torch"] = sys.modules["torch"].get_rng_state()
+    return states
+
+
+def set_rng_states(states):
+    random.setstate(states["random"])
+    np.random.set_state(states["numpy"])
+    if "torch" in states and "torch" in sys.modules:
+        sys.modules["torch"].set_rng_state(states["torch"])
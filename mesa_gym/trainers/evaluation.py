@@ -0,0 +1,238 @@
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from mesa_gym.trainers.qlearning import state_key
+from mesa_gym.trainers.sweep import make_env, agent_obs, live_ids, seed_world
+from mesa_gym.trainers.workers import available_cpus, pin_worker, pool_size
+
+
+#######################
+# policies
+#######################
+
+# policies are given per agent type (class name of the agents), as specs that can be sent to the workers:
+# ("random",), ("qtable", path) or ("dqn", path); agent types without policy act randomly
+
+class RandomPolicy:
+
+    def act(self, obs, action_space):
+        """Returns the action, and whether the state was known to the policy."""
+        return action_space.sample(), True
+
+
+class QTablePolicy:
+
+    def __init__(self, path):
+        from mesa_gym.trainers.qtable import load_q_table
+        # memory-mapped tables are shared between the workers
+        self.q_table = load_q_table(path)
+
+    def act(self, obs, action_space):
+        q_values = self.q_table.get(state_key(obs))
+        if q_values is None:
+            return action_space.sample(), False
+        return int(np.argmax(q_values)), True
+
+
+class DQNPolicy:
+
+    def __init__(self, path):
+        import torch
+        self.state_dict = torch.load(path)
+        self.model = None
+
+    def act(self, obs, action_space):
+        import torch
+        from mesa_gym.trainers.DQN import load_dqn
+
+        if self.model is None:
+            self.model = load_dqn(self.state_dict, len(obs), action_space.n)
+            self.model.eval()
+        with torch.no_grad():
+            q_values = self.model(torch.tensor(np.asarray(obs, dtype=np.float32)).unsqueeze(0))
+        return int(q_values.argmax(1)), True
+
+
+POLICIES = {
+    "random": RandomPolicy,
+    "qtable": QTablePolicy,
+    "dqn": DQNPolicy,
+}
+
+
+def make_policy(spec):
+    if spec[0] not in POLICIES:
+        raise RuntimeError(f"Unknown policy '{spec[0]}'.")
+    return POLICIES[spec[0]](*spec[1:])
+
+
+#######################
+# episodes
+#######################
+
+# info keys reporting the state of the agents rather than events
+STATE_FIELDS = ("energy", "strength")
+
+def run_episodes(gym, env_kwargs, policy_specs, seeds, max_steps=None):
+    """Runs one headless episode per seed, returning a record per episode with, for each agent type,
+    the return, the number of each event (info keys) and the lookups of unknown states."""
+    uses_torch = any(spec[0] == "dqn" for spec in policy_specs.values())
+    if uses_torch:
+        import torch
+        torch.set_num_threads(1)    # one process per cpu
+
+    env = make_env(gym, env_kwargs)
+    policies = {agent_type: make_policy(spec) for agent_type, spec in policy_specs.items()}
+    default_policy = RandomPolicy()
+    # unique ids may change when worlds are rebuilt, action spaces are taken per agent type
+    action_spaces = {type(agent).__name__: env.action_space[agent.unique_id] for agent in env._get_agents()}
+    # the first reset keeps the world built with the environment: every seeded reset then builds its own world,
+    # so that an episode does not depend on the seeds run before it in the same worker
+    env.reset()
+
+    records = []
+    for seed in seeds:
+        random.seed(seed)
+        np.random.seed(seed)
+        if uses_torch:
+            torch.manual_seed(seed)
+        for agent_type in sorted(action_spaces):
+            action_spaces[agent_type].seed(random.getrandbits(32))
+        obs, info = env.reset(seed=seed)
+        seed_world(env)
+
+        types = {agent.unique_id: type(agent).__name__ for agent in env._get_agents()}
+        record = {"seed": seed, "length": 0, "returns": {}, "events": {}, "lookups": {}, "unknown": {}}
+        for agent_type in set(types.values()):
+            record["returns"][agent_type] = 0.0
+            record["events"][agent_type] = {}
+            record["lookups"][agent_type] = 0
+            record["unknown"][agent_type] = 0
+
+        done = False
+        while not done:
+            actions = {}
+            alive = live_ids(env)
+            for unique_id, agent_type in types.items():
+                if unique_id not in alive:
+                    continue
+                policy = policies.get(agent_type, default_policy)
+                actions[unique_id], known = policy.act(agent_obs(obs, unique_id), action_spaces[agent_type])
+                record["lookups"][agent_type] += 1
+                record["unknown"][agent_type] += not known
+
+            obs, rewards, terminated, truncated, info = env.step(actions)
+            record["length"] += 1
+
+            for unique_id, reward in rewards.items():
+                if unique_id in types:
+                    record["returns"][types[unique_id]] += float(np.sum(reward))
+            for unique_id, agent_info in info.items():
+                if unique_id in types:
+                    events = record["events"][types[unique_id]]
+                    for key, value in agent_info.items():
+                        if key not in STATE_FIELDS:
+                            events[key] = events.get(key, 0) + value
+
+            done = terminated or truncated or (max_steps is not None and record["length"] >= max_steps)
+
+        records.append(record)
+    return records
+
+
+#######################
+# evaluation
+#######################
+
+def evaluate(gym, policies, n_episodes=1000, seed=0, env_kwargs=None, max_steps=None, n_workers=None):
+    """Evaluates the policies (dict agent type -> policy spec) on `n_episodes` seeded episodes,
+    run headless across a pool of processes. Returns the aggregated statistics (see `aggregate`)."""
+    seeds = list(range(seed, seed + n_episodes))
+
+    cpus = available_cpus()
+    n_workers = pool_size(n_workers, cpus, n_episodes)
+
+    if n_workers == 1:
+        records = run_episodes(gym, env_kwargs, policies, seeds, max_steps)
+    else:
+        # contiguous chunks of seeds, several per worker to balance the load
+        n_chunks = min(n_episodes, n_workers * 4)
+        chunks = [[int(s) for s in chunk] for chunk in np.array_split(seeds, n_chunks)]
+        counter = multiprocessing.Value("i", 0)
+        with multiprocessing.Pool(n_workers, initializer=pin_worker, initargs=(cpus, counter)) as pool:
+            results = pool.starmap(run_episodes, [(gym, env_kwargs, policies, chunk, max_steps) for chunk in chunks])
+        records = [record for chunk_records in results for record in chunk_records]
+
+    return aggregate(records)
+
+
+def mean_ci(values, z=1.96):
+    """Mean and half-width of its confidence interval (95% by default, normal approximation)."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return float(np.mean(values)), float("nan")
+    return float(np.mean(values)), float(z * np.std(values, ddof=1) / np.sqrt(len(values)))
+
+
+def proportion_ci(successes, trials, z=1.96):
+    """Observed proportion and the bounds of its confidence interval (Wilson score interval, asymmetric)."""
+    if trials == 0:
+        return float("nan"), float("nan"), float("nan")
+    p = successes / trials
+    denominator = 1 + z ** 2 / trials
+    center = (p + z ** 2 / (2 * trials)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / trials + z ** 2 / (4 * trials ** 2)) / denominator
+    return float(p), float(max(0.0, center - half_width)), float(min(1.0, center + half_width))
+
+
+def aggregate(records):
+    """Statistics over the episodes: episode length and per agent type the return, as (mean, half-width
+    of the 95% confidence interval), and the rate of episodes with each event and the rate of lookups
+    of unknown states, as (rate, low, high) with the bounds of the 95% confidence interval."""
+    n = len(records)
+    summary = {"episodes": n, "length": mean_ci([record["length"] for record in records]), "agents": {}}
+
+    agent_types = sorted({agent_type for record in records for agent_type in record["returns"]})
+    for agent_type in agent_types:
+        typed = [record for record in records if agent_type in record["returns"]]
+        event_keys = sorted({key for record in typed for key in record["events"][agent_type]})
+        lookups = sum(record["lookups"][agent_type] for record in typed)
+        unknown = sum(record["unknown"][agent_type] for record in typed)
+        summary["agents"][agent_type] = {
+            "return": mean_ci([record["returns"][agent_type] for record in typed]),
+            "events": {key: proportion_ci(sum(record["events"][agent_type].get(key, 0) > 0 for record in typed), len(typed))
+                       for key in event_keys},
+            "unknown_rate": proportion_ci(unknown, lookups),
+        }
+    return summary
+
+
+def print_summary(summary):
+    value, ci = summary["length"]
+    print(f"episodes: {summary['episodes']}, length: {value:.2f} ± {ci:.2f}")
+    for agent_type, stats in summary["agents"].items():
+        value, ci = stats["return"]
+        print(f"{agent_type}: return {value:.2f} ± {ci:.2f}")
+        for key, (value, low, high) in stats["events"].items():
+            print(f"    episodes with '{key}': {value:.3f} [{low:.3f}, {high:.3f}]")
+        value, low, high = stats["unknown_rate"]
+        print(f"    unknown states: {value:.3f} [{low:.3f}, {high:.3f}]")
+
+
+#######################
+# main
+#######################
+
+if __name__ == "__main__":
+
+    path = os.path.dirname(os.path.abspath(__file__))
+
+    summary = evaluate("lumberjack", {
+        "StrongLumberjack": ("random",),
+        "WeakLumberjack": ("random",),
+        # eg. "StrongLumberjack": ("qtable", f"{path}/../gyms/grid/lumberjack/models/<FILENAME>.qtable"),
+    }, n_episodes=1000, env_kwargs={"max_episode_steps": 200})
+    print_summary(summary)
@@ -1,6 +1,13 @@
 from collections import defaultdict
 import numpy as np
 
+def state_key(obs):
+    """Key of a state in the Q-table: hashed observations (ints) are their own key, others are turned into tuples."""
+    if isinstance(obs, (int, np.integer)):
+        return int(obs)
+    return tuple(obs)
+
+
 class QLearningTrainer:
 
     def __init__(self, agent, action_space, learning_rate: float, initial_epsilon: float, epsilon_decay: float, final_epsilon: float, discount_factor: float = 0.95):
@@ -21,6 +28,10 @@ class QLearningTrainer:
 
         self.training_error = []
 
+        # states updated since the last call to get_state, for incremental checkpoints
+        self.changed_states = set()
+        self.saved_errors = 0
+
     def select_action(self, obs) -> int:
         """Returns the best action with probability (1 - epsilon)
         otherwise a random action with probability epsilon to ensure exploration."""
@@ -28,23 +39,54 @@ class QLearningTrainer:
         if np.random.random() < self.epsilon:
             return self.action_space.sample()
         else:
-            return int(np.argmax(self.q_values[tuple(obs)]))
+            return int(np.argmax(self.q_values[state_key(obs)]))
 
     def update(self, obs: tuple, action: int, reward: float, terminated: bool, next_obs: tuple):
-        """Updates the Q-value of an action."""
+        """Updates the Q-value of an action (`next_obs` is not looked up if terminated, and may be None)."""
 
-        future_q_value = (not terminated) * np.max(self.q_values[tuple(next_obs)])
+        key = state_key(obs)
+        # terminal states are not added to the table
+        future_q_value = 0 if terminated else np.max(self.q_values[state_key(next_obs)])
         temporal_difference = (
-                reward + self.discount_factor * future_q_value - self.q_values[tuple(obs)][action]
+                reward + self.discount_factor * future_q_value - self.q_values[key][action]
         )
 
-        self.q_values[tuple(obs)][action] = (
-                self.q_values[tuple(obs)][action] + self.lr * temporal_difference
+        self.q_values[key][action] = (
+                self.q_values[key][action] + self.lr * temporal_difference
         )
         self.training_error.append(temporal_difference)
+        self.changed_states.add(key)
 
     def decay_epsilon(self):
         self.epsilon = max(self.final_epsilon, self.epsilon - self.epsilon_decay)
 
     def q_table(self):
-        return dict(self.q_values)
\ No newline at end of file
+        return dict(self.q_values)
+
+    def get_state(self, full=True):
+        """Returns the state of the trainer to be checkpointed; if not `full`, only the
+        q-values and the training errors changed since the previous call are included."""
+
+        states = self.q_values.keys() if full else self.changed_states
+        errors = self.training_error if full else self.training_error[self.saved_errors:]
+        state = {
+            "full": full,
+            "q_values": {obs: self.q_values[obs].copy() for obs in states},
+            "training_error": list(errors),
+            "epsilon": self.epsilon,
+        }
+        self.changed_states = set()
+        self.saved_errors = len(self.training_error)
+        return state
+
+    def set_state(self, state):
+        """Restores a state returned by get_state, applied on top of the current one if not full."""
+
+        if state["full"]:
+            self.q_values.clear()
+            self.training_error = []
+        self.q_values.update(state["q_values"])
+        self.training_error += state["training_error"]
+        self.epsilon = state["epsilon"]
+        self.changed_states = set()
+        self.saved_errors = len(self.training_error)
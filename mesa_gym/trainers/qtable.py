@@ -0,0 +1,113 @@
+import os
+import pickle
+
+import numpy as np
+
+
+# on-disk format of a Q-table: a directory with
+# - keys.npy: (n_states, n_features) float64 matrix of the states, sorted by their bytes
+#   (or a (n_states, 1) uint64 matrix for tables keyed by hashed observations, see state_key)
+# - values.npy: (n_states, n_actions) matrix of the q-values, in the same order
+# - greedy.npy: best action of each state, precomputed
+# all arrays are memory-mapped at loading time, so that loading is immediate
+# and processes reading the same table share its pages
+
+def _as_rows(keys, dtype=np.float64):
+    rows = np.asarray(keys, dtype=dtype)
+    if rows.dtype.kind == "f":
+        rows = rows + 0.0   # removes negative zeros, that would not compare equal byte-wise
+    rows = np.ascontiguousarray(rows)
+    if rows.ndim == 1:
+        rows = rows.reshape(1, -1)
+    return rows.view(np.dtype((np.void, rows.shape[1] * rows.itemsize))).ravel()
+
+
+def _as_key(state):
+    # hashed observations are single-feature states
+    if isinstance(state, (int, np.integer)):
+        return (int(state),)
+    return tuple(state)
+
+
+def save_q_table(q_table, path):
+    """Saves a Q-table (dict state -> q-values, see `QLearningTrainer.q_table`) in the memory-mappable format."""
+    if len(q_table) == 0:
+        raise RuntimeError("Cannot save an empty Q-table.")
+
+    hashed = all(isinstance(state, (int, np.integer)) for state in q_table.keys())
+    dtype = np.uint64 if hashed else np.float64
+    keys = _as_rows([_as_key(state) for state in q_table.keys()], dtype)
+    keys = keys.view(dtype).reshape(len(q_table), -1)
+    values = np.array(list(q_table.values()))
+    order = np.argsort(_as_rows(keys, dtype), kind="stable")
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "keys.npy"), keys[order])
+    np.save(os.path.join(path, "values.npy"), values[order])
+    np.save(os.path.join(path, "greedy.npy"), np.argmax(values[order], axis=1))
+
+
+def load_q_table(path):
+    """Loads a Q-table saved either in the memory-mappable format or as a pickled dict."""
+    if os.path.isdir(path):
+        return QTable(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class QTable:
+    """Read-only Q-table memory-mapped from disk.
+
+    It behaves as the dict of the trainer for lookups (`state in table`, `table[state]`),
+    and gives the precomputed greedy actions, also for batches of states."""
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = np.load(os.path.join(path, "keys.npy"), mmap_mode="r")
+        self.values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        self.greedy = np.load(os.path.join(path, "greedy.npy"), mmap_mode="r")
+        # the keys are saved normalized and contiguous, so they can be viewed as rows without copy
+        self._rows = self.keys.view(np.dtype((np.void, self.keys.shape[1] * self.keys.itemsize))).ravel()
+
+    def lookup(self, states):
+        """Indexes of a batch of states in the table, -1 for unknown states."""
+        if not isinstance(states, np.ndarray):
+            states = [_as_key(state) for state in states]
+        states = np.asarray(states, dtype=self.keys.dtype)
+        if states.ndim == 1 and self.keys.shape[1] == 1:
+            states = states.reshape(-1, 1)     # batch of hashes
+        if states.ndim != 2 or states.shape[1] != self.keys.shape[1]:
+            return np.full(len(states), -1)
+        rows = _as_rows(states, self.keys.dtype)
+        indexes = np.minimum(np.searchsorted(self._rows, rows), len(self._rows) - 1)
+        return np.where(self._rows[indexes] == rows, indexes, -1)
+
+    def index(self, state):
+        return int(self.lookup([state])[0])
+
+    def greedy_action(self, state):
+        index = self.index(state)
+        if index < 0:
+            raise KeyError(_as_key(state))
+        return int(self.greedy[index])
+
+    def greedy_actions(self, states):
+        """Greedy actions of a batch of states, -1 for unknown states."""
+        indexes = self.lookup(states)
+        return np.where(indexes >= 0, self.greedy[indexes], -1)
+
+    def get(self, state, default=None):
+        index = self.index(state)
+        return default if index < 0 else self.values[index]
+
+    def __getitem__(self, state):
+        index = self.index(state)
+        if index < 0:
+            raise KeyError(_as_key(state))
+        return self.values[index]
+
+    def __contains__(self, state):
+        return self.index(state) >= 0
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,382 @@
+import csv
+import hashlib
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import numpy as np
+
+from mesa_gym.trainers.workers import available_cpus, pin_worker, pool_size, worker_cpu
+
+
+# gyms that can be swept, as module and class of their gymnasium environment
+ENVIRONMENTS = {
+    "goal_world": ("mesa_gym.gyms.grid.goal_world.env", "MesaGoalEnv"),
+    "zzt_basic": ("mesa_gym.gyms.grid.zzt_basic.env", "MesaZZTEnv"),
+    "sacred_water": ("mesa_gym.gyms.grid.sacred_water.env", "MesaSacredWaterEnv"),
+    "lumberjack": ("mesa_gym.gyms.grid.lumberjack.env", "MesaLumberjackEnv"),
+}
+
+# default hyperparameters of the trainers, as in the training scripts
+DEFAULTS = {
+    "qlearning": {
+        "n_episodes": 1000,
+        "learning_rate": 0.05,
+        "discount_factor": 0.95,
+        "start_epsilon": 1.0,
+        "epsilon_decay": None,      # None for start_epsilon / (n_episodes / 2)
+        "final_epsilon": 0.1,
+    },
+    "dqn": {
+        "n_episodes": 1000,
+        "replay_batch_size": 32,
+        "learning_rate": 0.001,
+        "discount_factor": 0.95,
+        "start_epsilon": 1.0,
+        "epsilon_decay": None,      # None for start_epsilon / (n_episodes / 2)
+        "final_epsilon": 0.1,
+        "update_rate": 0.005,
+        "prioritized_replay": False,
+        "encoder": "mlp",           # "conv" for the gyms observed as occupancy planes (goal_world, sacred_water)
+    },
+}
+
+
+#######################
+# environments and agents
+#######################
+
+def make_env(gym, env_kwargs=None):
+    if gym not in ENVIRONMENTS:
+        raise RuntimeError(f"Unknown gym '{gym}'.")
+    module_name, class_name = ENVIRONMENTS[gym]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)(render_mode=None, **(env_kwargs or {}))
+
+
+def agent_keys(env):
+    """Keys of the agents stable across episodes (unique ids may change when worlds are rebuilt):
+    the type of the agent and its rank among the agents of that type."""
+    keys = {}
+    counts = {}
+    for agent in env._get_agents():
+        name = type(agent).__name__
+        keys[agent.unique_id] = (name, counts.get(name, 0))
+        counts[name] = counts.get(name, 0) + 1
+    return keys
+
+
+def live_ids(env):
+    return {agent.unique_id for agent in env._get_agents()}
+
+
+def agent_obs(obs, unique_id):
+    """Observation of an agent, from per-agent or global observations (None if the agent is not observed)."""
+    if isinstance(obs, dict):
+        return obs.get(unique_id)
+    return obs
+
+
+def seed_world(env):
+    """Reseeds the world just created by a reset from the (seeded) random module,
+    as mesa models otherwise draw their seed from the operating system."""
+    env.model.random.seed(random.getrandbits(64))
+    if hasattr(env.model, "np_random"):
+        env.model.np_random = np.random.default_rng(env.model.random.getrandbits(64))
+
+
+def total_reward(rewards):
+    return float(sum(np.sum(reward) for reward in rewards.values()))
+
+
+#######################
+# training functions
+#######################
+
+# a training function takes (gym, env_kwargs, config, seed) and returns a dict of metrics
+
+def train_qlearning(gym, env_kwargs, config, seed):
+    from mesa_gym.trainers.qlearning import QLearningTrainer
+
+    env = make_env(gym, env_kwargs)
+    env.action_space.seed(seed)     # exploration samples the action spaces
+    n_episodes = config["n_episodes"]
+    epsilon_decay = config["epsilon_decay"] or config["start_epsilon"] / (n_episodes / 2)
+
+    trainers = {}
+    episode_rewards = []
+    episode_lengths = []
+    for episode in range(n_episodes):
+        obs, info = env.reset(seed=seed if episode == 0 else None)
+        seed_world(env)
+        keys = agent_keys(env)
+        for unique_id, key in keys.items():
+            if key not in trainers:
+                trainers[key] = QLearningTrainer(agent=key, action_space=env.action_space[unique_id],
+                                                 learning_rate=config["learning_rate"],
+                                                 initial_epsilon=config["start_epsilon"],
+                                                 discount_factor=config["discount_factor"],
+                                                 epsilon_decay=epsilon_decay,
+                                                 final_epsilon=config["final_epsilon"])
+
+        done = False
+        episode_reward = 0
+        step = 0
+        while not done:
+            # agents removed from the world (eg. eaten) stop acting
+            alive = live_ids(env)
+            live = {unique_id: key for unique_id, key in keys.items() if unique_id in alive}
+            actions = {}
+            for unique_id, key in live.items():
+                actions[unique_id] = trainers[key].select_action(agent_obs(obs, unique_id))
+            next_obs, rewards, terminated, truncated, info = env.step(actions)
+
+            for unique_id, key in live.items():
+                reward = float(np.sum(rewards[unique_id])) if unique_id in rewards else 0
+                next_agent_obs = agent_obs(next_obs, unique_id)    # None when removed
+                trainers[key].update(agent_obs(obs, unique_id), actions[unique_id], reward,
+                                     terminated or next_agent_obs is None, next_agent_obs)
+            obs = next_obs
+
+            episode_reward += total_reward(rewards)
+            done = terminated or truncated
+            step += 1
+
+        for trainer in trainers.values():
+            trainer.decay_epsilon()
+        episode_rewards.append(episode_reward)
+        episode_lengths.append(step)
+
+    return summarize(episode_rewards, episode_lengths, n_states=sum(len(t.q_values) for t in trainers.values()))
+
+
+def train_dqn(gym, env_kwargs, config, seed):
+    from mesa_gym.trainers.DQN import DQNTrainer, device
+    from gymnasium import spaces
+    import torch
+
+    torch.manual_seed(seed)
+    torch.set_num_threads(1)   # one process per cpu
+
+    env = make_env(gym, env_kwargs)
+    env.action_space.seed(seed)     # exploration samples the action spaces
+    n_episodes = config["n_episodes"]
+    epsilon_decay = config["epsilon_decay"] or config["start_epsilon"] / (n_episodes / 2)
+    update_rate = config["update_rate"]
+
+    def to_state(obs, unique_id):
+        observation = agent_obs(obs, unique_id)
+        if observation is None:
+            return None
+        return torch.tensor(np.asarray(observation, dtype=np.float32), device=device).unsqueeze(0)
+
+    trainers = {}
+    episode_rewards = []
+    episode_lengths = []
+    for episode in range(n_episodes):
+        obs, info = env.reset(seed=seed if episode == 0 else None)
+        seed_world(env)
+        keys = agent_keys(env)
+        for unique_id, key in keys.items():
+            if key not in trainers:
+                # sized on the actual observations, as the spaces declared by some envs are wider
+                observation_space = spaces.Box(-np.inf, np.inf, (len(agent_obs(obs, unique_id)),))
+                trainers[key] = DQNTrainer(agent=key, observation_space=observation_space,
+                                           action_space=env.action_space[unique_id],
+                                           replay_batch_size=config["replay_batch_size"],
+                                           discount_factor=config["discount_factor"],
+                                           initial_epsilon=config["start_epsilon"],
+                                           final_epsilon=config["final_epsilon"],
+                                           epsilon_decay=epsilon_decay,
+                                           update_rate=update_rate,
+                                           learning_rate=config["learning_rate"],
+                                           prioritized_replay=config["prioritized_replay"],
+                                           encoder=config["encoder"],
+                                           grid_shape=(env.model.height, env.model.width))
+        states = {unique_id: to_state(obs, unique_id) for unique_id in keys}
+
+        done = False
+        episode_reward = 0
+        step = 0
+        while not done:
+            actions = {unique_id: trainers[key].select_action(states[unique_id])
+                       for unique_id, key in keys.items() if states[unique_id] is not None}
+            obs, rewards, terminated, truncated, info = env.step({unique_id: int(action) for unique_id, action in actions.items()})
+            done = terminated or truncated
+
+            for unique_id, key in keys.items():
+                if states[unique_id] is None:
+                    continue
+                reward = torch.tensor([float(np.sum(rewards.get(unique_id, 0)))], device=device)
+                next_state = None if terminated else to_state(obs, unique_id)   # None also when removed
+                trainers[key].memory.push(states[unique_id], actions[unique_id], next_state, reward)
+                states[unique_id] = next_state
+
+                # optimization and soft update of the target network, as in the training scripts
+                trainers[key].optimize_model()
+                trainers[key].soft_update()
+
+            episode_reward += total_reward(rewards)
+            step += 1
+
+        episode_rewards.append(episode_reward)
+        episode_lengths.append(step)
+
+    return summarize(episode_rewards, episode_lengths)
+
+
+TRAINERS = {
+    "qlearning": train_qlearning,
+    "dqn": train_dqn,
+}
+
+
+def summarize(episode_rewards, episode_lengths, **extra):
+    last = max(1, len(episode_rewards) // 10)
+    metrics = {
+        "mean_reward": float(np.mean(episode_rewards)),
+        "final_mean_reward": float(np.mean(episode_rewards[-last:])),
+        "mean_episode_length": float(np.mean(episode_lengths)),
+    }
+    metrics.update(extra)
+    return metrics
+
+
+#######################
+# sweep
+#######################
+
+def code_version():
+    """Hash of the sources of mesa_gym, so that results are recomputed when the code changes."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for directory, subdirectories, filenames in sorted(os.walk(root)):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(".py"):
+                digest.update(os.path.relpath(os.path.join(directory, filename), root).encode())
+                with open(os.path.join(directory, filename), "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def config_hash(run):
+    return hashlib.sha256(json.dumps(run, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def expand_grid(trainer, grid):
+    """All the configurations of the grid (dict parameter -> list of values), completed with the defaults."""
+    if trainer not in DEFAULTS:
+        raise RuntimeError(f"Unknown trainer '{trainer}'.")
+    for name in grid:
+        if name not in DEFAULTS[trainer]:
+            raise RuntimeError(f"Unknown hyperparameter '{name}' for trainer '{trainer}'.")
+    names = list(grid.keys())
+    for values in itertools.product(*[grid[name] for name in names]):
+        config = dict(DEFAULTS[trainer])
+        config.update(zip(names, values))
+        yield config
+
+
+def _run(run, path):
+    random.seed(run["seed"])
+    np.random.seed(run["seed"])
+
+    start = time.monotonic()
+    metrics = TRAINERS[run["trainer"]](run["gym"], run["env_kwargs"], run["config"], run["seed"])
+    result = dict(run, metrics=metrics, seconds=time.monotonic() - start, cpu=worker_cpu())
+
+    with open(path + ".tmp", "w") as f:
+        json.dump(result, f, default=str)
+    os.replace(path + ".tmp", path)
+    return result
+
+
+def run_sweep(gym, trainer, grid, seeds=(0,), env_kwargs=None, results_dir="sweeps", n_workers=None):
+    """Trains all the configurations of the grid for each seed, in a pool of processes.
+
+    Each run is identified by the hash of its configuration, seed and code version: runs already
+    in `results_dir` are not recomputed. Returns the rows of the summary table, which is also
+    written in `results_dir/summary.csv` (indexed by the hash of the runs)."""
+
+    if trainer not in TRAINERS:
+        raise RuntimeError(f"Unknown trainer '{trainer}'.")
+    os.makedirs(os.path.join(results_dir, "runs"), exist_ok=True)
+    version = code_version()
+
+    runs = {}
+    for config in expand_grid(trainer, grid):
+        for seed in seeds:
+            run = {"gym": gym, "trainer": trainer, "env_kwargs": env_kwargs or {},
+                   "config": config, "seed": seed, "code_version": version}
+            runs[config_hash(run)] = run
+
+    results = {}
+    todo = []
+    for run_hash, run in runs.items():
+        path = os.path.join(results_dir, "runs", f"{run_hash}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                results[run_hash] = json.load(f)
+        else:
+            todo.append((run, path, run_hash))
+
+    if todo:
+        cpus = available_cpus()
+        n_workers = pool_size(n_workers, cpus, len(todo))
+        counter = multiprocessing.Value("i", 0)
+        with multiprocessing.Pool(n_workers, initializer=pin_worker, initargs=(cpus, counter)) as pool:
+            pending = [(run_hash, pool.apply_async(_run, (run, path))) for run, path, run_hash in todo]
+            for run_hash, result in pending:
+                results[run_hash] = result.get()
+
+    rows = [summary_row(run_hash, results[run_hash]) for run_hash in runs]
+    write_summary(os.path.join(results_dir, "summary.csv"), rows)
+    return rows
+
+
+def summary_row(run_hash, result):
+    row = {"hash": run_hash, "gym": result["gym"], "trainer": result["trainer"], "seed": result["seed"]}
+    row.update(result["config"])
+    row.update(result["metrics"])
+    row["seconds"] = result["seconds"]
+    return row
+
+
+def write_summary(path, rows):
+    """Merges the rows into the summary table, replacing the rows with the same hash."""
+    table = {row["hash"]: row for row in load_summary(path)} if os.path.exists(path) else {}
+    for row in rows:
+        table[row["hash"]] = row
+
+    fields = []
+    for row in table.values():
+        fields += [field for field in row if field not in fields]
+    with open(path + ".tmp", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(table.values())
+    os.replace(path + ".tmp", path)
+
+
+def load_summary(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+#######################
+# main
+#######################
+
+if __name__ == "__main__":
+
+    rows = run_sweep("goal_world", "qlearning",
+                     grid={"learning_rate": [0.01, 0.05, 0.1], "discount_factor": [0.9, 0.95], "n_episodes": [100]},
+                     seeds=[0, 1],
+                     env_kwargs={"max_episode_steps": 1000})
+    for row in sorted(rows, key=lambda row: -row["final_mean_reward"]):
+        print(row)
@@ -0,0 +1,33 @@
+import os
+
+
+# pools of processes pinned to distinct cpus, shared by the sweeps and the evaluations
+
+_worker_cpu = None
+
+
+def available_cpus():
+    """Cpus this process may run on (None where the platform does not tell)."""
+    return sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+
+
+def pool_size(n_workers, cpus, n_tasks):
+    n_workers = n_workers or (len(cpus) if cpus else os.cpu_count())
+    return max(1, min(n_workers, n_tasks))
+
+
+def pin_worker(cpus, counter):
+    """Initializer of the workers of a pool: each worker is pinned to its own cpu, where the platform
+    allows it. `counter` is a multiprocessing.Value("i", 0) shared by the workers."""
+    global _worker_cpu
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    if cpus and hasattr(os, "sched_setaffinity"):
+        _worker_cpu = cpus[index % len(cpus)]
+        os.sched_setaffinity(0, {_worker_cpu})
+
+
+def worker_cpu():
+    """Cpu the current worker is pinned to (None if not pinned)."""
+    return _worker_cpu